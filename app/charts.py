@@ -0,0 +1,207 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Optional: with Pillow, oversized charts are scaled down instead of rejected
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Largest decoded chart accepted, in bytes
+CHART_MAX_BYTES = int(os.getenv("CHART_MAX_BYTES", str(4 * 1024 * 1024)))
+# Largest chart embedded as is (width x height); bigger ones are scaled down with Pillow, rejected without it
+CHART_MAX_PIXELS = int(os.getenv("CHART_MAX_PIXELS", str(2000 * 1500)))
+# Charts claiming more pixels than this are refused before any decoding, with or without Pillow
+CHART_HARD_PIXELS = 4 * CHART_MAX_PIXELS
+# Charts wider than this are scaled down when Pillow is installed (~240 dpi across an A4 page)
+CHART_MAX_WIDTH = int(os.getenv("CHART_MAX_WIDTH", "1600"))
+# Decoded charts kept in memory, keyed by content hash
+CHART_CACHE_MB = int(os.getenv("CHART_CACHE_MB", "64"))
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+COLOR_SPACES = {0: "DeviceGray", 2: "DeviceRGB", 3: "Indexed", 4: "DeviceGray", 6: "DeviceRGB"}
+
+
+class ChartError(ValueError):
+    """An uploaded chart image that cannot be embedded."""
+
+
+def _chunks(data):
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += length + 12
+        if kind == b"IEND":
+            return
+
+
+def _header(data):
+    """(width, height, bit depth, color type, interlace) of a PNG."""
+    if not data.startswith(PNG_SIGNATURE) or data[12:16] != b"IHDR":
+        raise ChartError("Chart is not a PNG image")
+    width, height, bpc, ct, _, _, interlace = struct.unpack(">IIBBBBB", data[16:29])
+    return width, height, bpc, ct, interlace
+
+
+def _image_info(data):
+    """
+    The image dict FPDF builds from a PNG file, built from the bytes in
+    memory. The scanlines stay filtered: FPDF embeds them with the PNG
+    predictor, and an alpha channel is split off column-wise with numpy
+    instead of FPDF's per-row regular expressions.
+    """
+    width, height, bpc, ct, interlace = _header(data)
+    if bpc > 8 or interlace or ct not in COLOR_SPACES:
+        raise ChartError("Unsupported PNG (16-bit, interlaced or unknown color type)")
+    colors = 3 if COLOR_SPACES[ct] == "DeviceRGB" else 1
+    info = {"w": width, "h": height, "cs": COLOR_SPACES[ct], "bpc": bpc, "f": "FlateDecode",
+            "dp": f"/Predictor 15 /Colors {colors} /BitsPerComponent {bpc} /Columns {width}",
+            "pal": "", "trns": ""}
+
+    idat = []
+    for kind, body in _chunks(data):
+        if kind == b"PLTE":
+            info["pal"] = body
+        elif kind == b"tRNS":
+            if ct == 0:
+                info["trns"] = [body[1]]
+            elif ct == 2:
+                info["trns"] = [body[1], body[3], body[5]]
+            elif body.find(b"\x00") != -1:
+                info["trns"] = [body.find(b"\x00")]
+        elif kind == b"IDAT":
+            idat.append(body)
+    if ct == 3 and not info["pal"]:
+        raise ChartError("Chart PNG has no palette")
+    data = b"".join(idat)
+
+    if ct >= 4:
+        # Filter bytes work per channel, so the filtered rows can be split as they are
+        channels = colors + 1
+        size = height * (1 + channels * width)
+        try:
+            # Inflate no more than the header says the image holds
+            inflater = zlib.decompressobj()
+            raw = inflater.decompress(data, size)
+        except zlib.error:
+            raise ChartError("Chart PNG data is corrupt")
+        if inflater.unconsumed_tail or len(raw) != size:
+            raise ChartError("Chart PNG data is corrupt")
+        rows = np.frombuffer(raw, dtype=np.uint8).reshape(height, 1 + channels * width)
+        pixels = rows[:, 1:].reshape(height, width, channels)
+        color = np.concatenate([rows[:, :1], pixels[:, :, :colors].reshape(height, -1)], axis=1)
+        alpha = np.concatenate([rows[:, :1], pixels[:, :, colors]], axis=1)
+        data = zlib.compress(color.tobytes())
+        info["smask"] = zlib.compress(alpha.tobytes())
+    info["data"] = data
+    return info
+
+
+def _downscale(data, width, height):
+    # Pillow re-encodes the chart at CHART_MAX_WIDTH (and within CHART_MAX_PIXELS). Callers
+    # stay below CHART_HARD_PIXELS, so Pillow's own decompression-bomb limit is left alone
+    scale = min(1.0, CHART_MAX_WIDTH / width, (CHART_MAX_PIXELS / (width * height)) ** 0.5)
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", size)
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+            factor = int(1 / scale)
+            if factor > 1:
+                img = img.reduce(factor)
+            img = img.resize(size, Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, format="PNG", compress_level=1)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ChartError(f"Chart image could not be decoded: {e}")
+    return out.getvalue()
+
+
+class ChartCache:
+    """Decoded chart images by content hash, least recently used dropped beyond `max_bytes`."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            info = self.entries.get(key)
+            if info is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return info
+
+    def put(self, key, info):
+        nbytes = len(info["data"]) + len(info.get("smask", b""))
+        with self._lock:
+            if key in self.entries or nbytes > self.max_bytes:
+                return
+            self.entries[key] = info
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, old = self.entries.popitem(last=False)
+                self.size -= len(old["data"]) + len(old.get("smask", b""))
+
+    def stats(self):
+        return {"charts": len(self.entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+cache = ChartCache(CHART_CACHE_MB * 1024 * 1024)
+
+
+def decode_chart(data_url):
+    """
+    (content hash, FPDF image dict) of a chart uploaded as a PNG data URL
+    (or bare base64), decoded once per distinct image. Oversized charts are
+    scaled down when Pillow is installed and rejected with ChartError
+    otherwise.
+    """
+    payload = data_url.split(",", 1)[1] if data_url.startswith("data:") else data_url
+    if len(payload) * 3 // 4 > CHART_MAX_BYTES:
+        raise ChartError(f"Chart image exceeds {CHART_MAX_BYTES // 1024} KB")
+    key = hashlib.sha1(payload.encode()).hexdigest()
+    info = cache.get(key)
+    if info is not None:
+        return key, info
+
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        raise ChartError("Chart image is not valid base64")
+    width, height, bpc, _, interlace = _header(data)
+    if width * height > CHART_HARD_PIXELS:
+        raise ChartError(f"Chart image of {width}x{height} pixels exceeds {CHART_HARD_PIXELS:,} pixels")
+    too_big = width * height > CHART_MAX_PIXELS or width > CHART_MAX_WIDTH
+    if Image is not None and (too_big or bpc > 8 or interlace):
+        data = _downscale(data, width, height)
+    elif width * height > CHART_MAX_PIXELS:
+        raise ChartError(f"Chart image of {width}x{height} pixels exceeds {CHART_MAX_PIXELS:,} pixels")
+    info = _image_info(data)
+    cache.put(key, info)
+    return key, info
+
+
+def place_chart(pdf, data_url, x=None, y=None, w=0, h=0):
+    """pdf.image() for a chart data URL, without writing it to a file."""
+    key, info = decode_chart(data_url)
+    name = f"chart-{key}.png"
+    if name not in pdf.images:
+        # FPDF reuses registered images by name; a copy, since it numbers the dict it writes out
+        pdf.images[name] = dict(info, i=len(pdf.images) + 1)
+    pdf.image(name, x=x, y=y, w=w, h=h)
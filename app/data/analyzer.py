@@ -1,9 +1,37 @@
 
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
 import pandas as pd
 
+from app.data.result_cache import ResultCache, cached
+
 class Analyzer:
-    def __init__(self, loader):
+    # Analysis method behind each idea id; all take the same filter arguments
+    IDEAS = {
+        1: 'idea_1_district_activity',
+        2: 'idea_2_biometric_camps',
+        3: 'idea_3_age_verifier',
+        4: 'idea_4_ghost_child',
+        5: 'idea_5_integrity_shield',
+        6: 'idea_6_financial',
+        7: 'idea_7_language_support',
+        8: 'idea_8_health_monitor',
+        9: 'idea_9_disaster_planning',
+        10: 'idea_10_urban_traffic',
+    }
+
+    def __init__(self, loader, cache_size=None):
         self.loader = loader
+        # Views shared by the ideas of one batch() call, and the Generation the
+        # current call reads, per request thread
+        self._scope = threading.local()
+        # Results per (method, filters, data version); RESULT_CACHE_SIZE=0 disables it
+        if cache_size is None:
+            cache_size = int(os.getenv('RESULT_CACHE_SIZE', '256'))
+        self.cache = ResultCache(cache_size)
         self.metadata = {
             1: {
                 "title": "District-Level Activity Insights", 
@@ -76,39 +104,126 @@ class Analyzer:
                 "reasons_low": "Effective implementation of appointment-only systems and decentralized neighborhood kiosks."
             }
         }
-        self.pincode_map = {
-            "380001": "Lal Darwaja", "380002": "Kalupur", "380003": "Maju", "380004": "Shahibaug",
-            "380005": "Sabarmati", "380006": "Ellisbridge", "380007": "Paldi", "380008": "Maninagar",
-            "380009": "Navrangpura", "380013": "Naranpura", "380015": "Ambawadi", "380019": "Ghatlodia",
-            "380021": "Bapunagar", "380022": "Naroda", "380024": "Bapunagar Ind.", "380026": "Amraiwadi",
-            "380028": "Vejalpur", "380050": "Ghodasar", "380051": "Jivraj Park", "380052": "Thaltej",
-            "380054": "Bodakdev", "380055": "Jodhpur", "380058": "Sarkhej", "380059": "Gota",
-            "380060": "Science City", "380061": "Ghatlodia",
-            # Add some sample UP codes for testing if needed, or other Gujarat
-            "382010": "Gandhinagar", "382330": "Naroda", "382340": "Naroda Road", "382345": "India Colony"
-        }
 
-    def _get_area_name(self, pincode):
-        pincode = str(pincode).strip()
-        if pincode in self.pincode_map:
-            return f"{self.pincode_map[pincode]} ({pincode})"
-        return pincode
+    def _labels(self, pincodes):
+        """Display labels ('Area (pincode)') for a whole vector of pincodes."""
+        return self.loader.pincodes.labels(pincodes)
 
-    def get_summary(self, state_filter=None, district_filter=None):
-        enrol = self.filter_data(self.loader.enrolment_df, state_filter, district_filter)
-        demo = self.filter_data(self.loader.demographic_df, state_filter, district_filter)
-        bio = self.filter_data(self.loader.biometric_df, state_filter, district_filter)
+    @cached
+    def get_summary(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
+        enrol = self._view('enrolment', 'district', state_filter, district_filter, date_from, date_to)
+        demo = self._view('demographic', 'district', state_filter, district_filter, date_from, date_to)
+        bio = self._view('biometric', 'district', state_filter, district_filter, date_from, date_to)
         
         summary = {
-            "total_enrolment": int(enrol['age_0_5'].sum() + enrol['age_5_17'].sum() + enrol.get('age_18_above', 0).sum()),
-            "total_demographic_updates": int(demo['age_5_17'].sum() + demo['age_18_above'].sum()),
-            "total_biometric_updates": int(bio['age_5_17'].sum() + bio['age_18_above'].sum()),
+            "total_enrolment": int(enrol['total'].sum()),
+            "total_demographic_updates": int(demo['total'].sum()),
+            "total_biometric_updates": int(bio['total'].sum()),
             "states_count":  enrol['state'].nunique(),
             "districts_count": enrol['district'].nunique()
         }
         return summary
 
+    def _view(self, name, level, state_filter=None, district_filter=None, date_from=None, date_to=None):
+        """
+        Pre-aggregated cells of one dataset at `level` (see app.data.cube),
+        restricted to a region and date window. Request handlers only ever
+        see such derived frames, never the loader's published ones.
+        """
+        state = state_filter if state_filter and state_filter != "All" else None
+        district = district_filter if district_filter and district_filter != "All" else None
+        return self._shared(('view', name, level, state, district, date_from, date_to),
+                            lambda: self._generation().cubes[name].view(level, state, district, date_from, date_to))
+
+    def _activity(self, level, state_filter=None, district_filter=None, date_from=None, date_to=None):
+        """
+        All datasets side by side at `level`: '<dataset>_total' and
+        '<dataset>_rows' columns per region cell (see cube.ActivityTable).
+        """
+        state = state_filter if state_filter and state_filter != "All" else None
+        district = district_filter if district_filter and district_filter != "All" else None
+        return self._shared(('activity', level, state, district, date_from, date_to),
+                            lambda: self._generation().activity.view(level, state, district, date_from, date_to))
+
+    def _generation(self):
+        """Generation read by the running call (see pinned()); the published one outside a call."""
+        return getattr(self._scope, 'generation', None) or self.loader.current
+
+    @contextmanager
+    def pinned(self):
+        """
+        Holds on to the published Generation for the duration of one call
+        (or batch), so every view it reads, and the cache entry it fills,
+        come from the same data even if a reload publishes a new one
+        meanwhile. Nested calls keep the outermost generation.
+        """
+        if getattr(self._scope, 'generation', None) is not None:
+            yield self._scope.generation
+            return
+        self._scope.generation = self.loader.current
+        try:
+            yield self._scope.generation
+        finally:
+            self._scope.generation = None
+
+    def _shared(self, key, compute):
+        # Outside batch() every call computes its own view
+        memo = getattr(self._scope, 'memo', None)
+        if memo is None:
+            return compute()
+        if key not in memo:
+            memo[key] = compute()
+        return memo[key]
+
+    def run_idea(self, idea_id, state_filter=None, district_filter=None, date_from=None, date_to=None):
+        """Result of one idea by id; KeyError for an unknown id."""
+        method = getattr(self, self.IDEAS[idea_id])
+        return method(state_filter=state_filter, district_filter=district_filter,
+                      date_from=date_from, date_to=date_to)
+
+    def batch(self, idea_ids=None, state_filter=None, district_filter=None, date_from=None, date_to=None,
+              summary=True):
+        """
+        Several ideas (all by default) and the summary for one filter in one
+        pass. Each filtered view is computed once and shared by every idea
+        that reads it; an idea that fails reports its error without failing
+        the others.
+        """
+        filters = dict(state_filter=state_filter, district_filter=district_filter,
+                       date_from=date_from, date_to=date_to)
+        result = {"ideas": {}}
+        self._scope.memo = {}
+        try:
+            with self.pinned():
+                if summary:
+                    result["summary"] = self.get_summary(**filters)
+                for idea_id in (idea_ids if idea_ids is not None else self.IDEAS):
+                    try:
+                        result["ideas"][idea_id] = self.run_idea(idea_id, **filters)
+                    except Exception as e:
+                        print(f"Batch idea {idea_id} failed: {e}")
+                        result["ideas"][idea_id] = {"idea_id": idea_id, "error": str(e)}
+        finally:
+            self._scope.memo = None
+        return result
+
+    def _level(self, group_col, district_filter=None):
+        # Coarsest cube level that still has the grouping and filter columns
+        if group_col == 'state' and district_filter and district_filter != "All":
+            return 'district'
+        return group_col
+
+    def _count(self, df, keys):
+        """Source rows per group. Aggregated frames carry that count in a 'rows' column."""
+        grouped = df.groupby(keys, observed=True)
+        return grouped['rows'].sum() if 'rows' in df.columns else grouped.size()
+
     def filter_data(self, df, state_filter=None, district_filter=None):
+        # Published frames are sorted by region: slice them through their index
+        cube = self.loader.cube_for(df, self._generation())
+        if cube is not None:
+            return cube.rows(state_filter if state_filter != "All" else None,
+                             district_filter if district_filter != "All" else None)
         if state_filter and state_filter != "All":
             df = df[df['state'] == state_filter]
         if district_filter and district_filter != "All":
@@ -144,25 +259,18 @@ class Analyzer:
         variation = "significant" if high_val > 2 * avg else "moderate"
         
         # Helper to format entity for narrative if it's a pincode
-        def format_ent(val):
-            return self._get_area_name(val) if entity_col == 'pincode' else val
+        high_name, low_name = high_row[entity_col], low_row[entity_col]
+        if entity_col == 'pincode':
+            high_name, low_name = self._labels([high_name, low_name])
             
-        narrative = (f"{format_ent(high_row[entity_col])} reports the highest {context} ({int(high_val):,}), showing {variation} deviation from the average ({int(avg):,}). "
-                     f"In contrast, {format_ent(low_row[entity_col])} reports the lowest ({int(low_row[metric_col]):,}). "
+        narrative = (f"{high_name} reports the highest {context} ({int(high_val):,}), showing {variation} deviation from the average ({int(avg):,}). "
+                     f"In contrast, {low_name} reports the lowest ({int(low_row[metric_col]):,}). "
                      f"This disparity suggests uneven resource allocation or demand patterns in the {variation} range.")
         return narrative
 
     # Idea 1: District/Pincode-Level Activity Insights
-    def idea_1_district_activity(self, state_filter=None, district_filter=None):
-        e_df = self.loader.enrolment_df
-        d_df = self.loader.demographic_df
-        b_df = self.loader.biometric_df
-
-        # Filter
-        e_df = self.filter_data(e_df, state_filter, district_filter)
-        d_df = self.filter_data(d_df, state_filter, district_filter)
-        b_df = self.filter_data(b_df, state_filter, district_filter)
-
+    @cached
+    def idea_1_district_activity(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
         # Drill-down Logic
         if district_filter and district_filter != "All":
             group_col = 'pincode'
@@ -173,17 +281,22 @@ class Analyzer:
         else:
             group_col = 'state'
             entity_name = 'State'
+
+        level = self._level(group_col, district_filter)
+        e_df = self._view('enrolment', level, state_filter, district_filter, date_from, date_to)
+        d_df = self._view('demographic', level, state_filter, district_filter, date_from, date_to)
+        b_df = self._view('biometric', level, state_filter, district_filter, date_from, date_to)
         
-        e_grp = e_df.groupby(group_col)[['age_0_5', 'age_5_17', 'age_18_above']].sum().sum(axis=1)
-        d_grp = d_df.groupby(group_col)[['age_5_17', 'age_18_above']].sum().sum(axis=1)
-        b_grp = b_df.groupby(group_col)[['age_5_17', 'age_18_above']].sum().sum(axis=1)
+        e_grp = e_df.groupby(group_col, observed=True)[['age_0_5', 'age_5_17', 'age_18_above']].sum().sum(axis=1)
+        d_grp = d_df.groupby(group_col, observed=True)[['age_5_17', 'age_18_above']].sum().sum(axis=1)
+        b_grp = b_df.groupby(group_col, observed=True)[['age_5_17', 'age_18_above']].sum().sum(axis=1)
 
         total_activity = (e_grp.add(d_grp, fill_value=0).add(b_grp, fill_value=0)).reset_index(name='value')
         total_activity = total_activity.sort_values('value', ascending=False)
         
         # Convert Pincode to string for labels if needed
         if group_col == 'pincode': 
-            total_activity[group_col] = total_activity[group_col].apply(lambda x: self._get_area_name(x))
+            total_activity[group_col] = self._labels(total_activity[group_col])
         
         top_data = total_activity.head(15)
         
@@ -193,17 +306,14 @@ class Analyzer:
         return self._format_response(1, top_data[group_col].tolist(), top_data['value'].tolist(), insight)
 
     # Idea 2: Biometric Update Camps
-    def idea_2_biometric_camps(self, state_filter=None, district_filter=None):
-        d_df = self.filter_data(self.loader.demographic_df, state_filter, district_filter)
-        b_df = self.filter_data(self.loader.biometric_df, state_filter, district_filter)
-
+    @cached
+    def idea_2_biometric_camps(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
         # Drill-down
         group_col = 'pincode' if district_filter and district_filter != "All" else 'district'
-        
-        d_grp = d_df.groupby(group_col)[['age_5_17', 'age_18_above']].sum().sum(axis=1)
-        b_grp = b_df.groupby(group_col)[['age_5_17', 'age_18_above']].sum().sum(axis=1)
+        activity = self._activity(group_col, state_filter, district_filter, date_from, date_to)
 
-        merged = pd.concat([d_grp, b_grp], axis=1, keys=['demo', 'bio']).fillna(0)
+        merged = activity.groupby(group_col, observed=True)[['demographic_total', 'biometric_total']].sum()
+        merged.columns = ['demo', 'bio']
         # Filter for meaningful activity
         merged = merged[merged['demo'] > (50 if group_col == 'district' else 10)] 
         
@@ -211,7 +321,7 @@ class Analyzer:
         
         target = merged.sort_values('bio_ratio').head(15).reset_index()
         if group_col == 'pincode': 
-             target[group_col] = target[group_col].apply(lambda x: self._get_area_name(x))
+             target[group_col] = self._labels(target[group_col])
 
         narrative = self._generate_narrative(target, 'bio_ratio', group_col, "biometric update efficiency")
         narrative = f"Bottom performing {group_col}s identified. " + narrative
@@ -219,75 +329,74 @@ class Analyzer:
         return self._format_response(2, target[group_col].tolist(), target['bio_ratio'].round(2).tolist(), narrative)
 
     # Idea 3: Zero-Knowledge Age Verifier
-    def idea_3_age_verifier(self, state_filter=None, district_filter=None):
-        e_df = self.loader.enrolment_df
-        e_df = self.filter_data(e_df, state_filter, district_filter)
-        
+    @cached
+    def idea_3_age_verifier(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
         group_col = 'pincode' if district_filter and district_filter != "All" else ('district' if state_filter and state_filter != "All" else 'state')
+        e_df = self._view('enrolment', self._level(group_col, district_filter), state_filter, district_filter, date_from, date_to)
         
         if 'age_18_above' not in e_df.columns: return self._format_response(3, [], [], "No 18+ data.")
         
-        voter_potential = e_df.groupby(group_col)['age_18_above'].sum().reset_index(name='value')
+        voter_potential = e_df.groupby(group_col, observed=True)['age_18_above'].sum().reset_index(name='value')
         voter_potential = voter_potential.sort_values('value', ascending=False).head(15)
         
         if group_col == 'pincode': 
-            voter_potential[group_col] = voter_potential[group_col].apply(lambda x: self._get_area_name(x))
+            voter_potential[group_col] = self._labels(voter_potential[group_col])
         
         insight = self._generate_narrative(voter_potential, 'value', group_col, "new 18+ enrolment")
         
         return self._format_response(3, voter_potential[group_col].tolist(), voter_potential['value'].tolist(), insight)
 
     # Idea 4: Ghost Child Indicator
-    def idea_4_ghost_child(self, state_filter=None, district_filter=None):
-        e_df = self.loader.enrolment_df
-        e_df = self.filter_data(e_df, state_filter, district_filter)
-        
+    @cached
+    def idea_4_ghost_child(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
         group_col = 'pincode' if district_filter and district_filter != "All" else 'district'
+        e_df = self._view('enrolment', group_col, state_filter, district_filter, date_from, date_to)
         
-        grp = e_df.groupby(group_col)['age_0_5'].sum()
+        grp = e_df.groupby(group_col, observed=True)['age_0_5'].sum()
         mean_enrolment = grp.mean()
         
         low_enrolment = grp[grp < (0.5 * mean_enrolment)].sort_values().head(15).reset_index(name='value')
         if group_col == 'pincode': 
-            low_enrolment[group_col] = low_enrolment[group_col].apply(lambda x: self._get_area_name(x))
+            low_enrolment[group_col] = self._labels(low_enrolment[group_col])
 
         insight = f"Critical Gap: {len(low_enrolment)} {group_col}s have less than 50% of the average child enrolment ({int(mean_enrolment)}). Lowest being {low_enrolment.iloc[0][group_col]} ({low_enrolment.iloc[0]['value']})."
         
         return self._format_response(4, low_enrolment[group_col].tolist(), low_enrolment['value'].tolist(), insight)
 
     # Idea 5: Integrity Shield
-    def idea_5_integrity_shield(self, state_filter=None, district_filter=None):
-        d_df = self.loader.demographic_df
-        d_df = self.filter_data(d_df, state_filter, district_filter)
-        
-        group_col = 'pincode' 
-        
-        daily_pincode_activity = d_df.groupby(['date', group_col]).size().reset_index(name='count')
-        mean_val = daily_pincode_activity['count'].mean()
-        threshold = max(50, mean_val * 3)
-        
-        anomalies = daily_pincode_activity[daily_pincode_activity['count'] > threshold].sort_values('count', ascending=False).head(15)
-        
-        labels = [f"{self._get_area_name(row[group_col])} ({row['date']})" for _, row in anomalies.iterrows()]
+    @cached
+    def idea_5_integrity_shield(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
+        # Spikes are scored against each pincode's own rolling baseline when the
+        # data is published (see app.data.anomaly); this only picks the window
+        engine = self._generation().anomalies['demographic']
+        state = state_filter if state_filter and state_filter != "All" else None
+        district = district_filter if district_filter and district_filter != "All" else None
+        flagged = engine.anomalies(state, district, date_from, date_to)
+        anomalies = flagged.head(15)
+
+        dates = pd.to_datetime(anomalies['day'], unit='D').dt.strftime('%d-%m-%Y')
+        labels = [f"{area} ({d})" for area, d in zip(self._labels(anomalies['pincode']), dates)]
         
         return self._format_response(5, labels, anomalies['count'].tolist(), 
-                                     f"Detected {len(anomalies)} instances of unusual spikes (> {int(threshold)} daily ops). Highest spike at {labels[0] if labels else 'None'}.")
+                                     f"Detected {len(flagged)} instances of unusual spikes (robust z-score >= {engine.threshold:g} against the pincode's own {engine.window}-day median). Highest spike at {labels[0] if labels else 'None'}.")
 
     # Idea 6: Financial Inclusion
-    def idea_6_financial(self, state_filter=None, district_filter=None):
+    @cached
+    def idea_6_financial(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
         # Mocking logic based on "Updates" as proxy for financial activity
-        d_df = self.filter_data(self.loader.demographic_df, state_filter, district_filter)
         group_col = 'pincode' if district_filter and district_filter != "All" else 'district'
+        d_df = self._view('demographic', group_col, state_filter, district_filter, date_from, date_to)
         
-        activity = d_df.groupby(group_col).size().reset_index(name='value').sort_values('value').head(15)
+        activity = self._count(d_df, group_col).reset_index(name='value').sort_values('value').head(15)
         if group_col == 'pincode': 
-            activity[group_col] = activity[group_col].apply(lambda x: self._get_area_name(x))
+            activity[group_col] = self._labels(activity[group_col])
         
         return self._format_response(6, activity[group_col].tolist(), activity['value'].tolist(), 
                                      f"Areas with lowest digital footprint updates, candidates for Jan Dhan linkage campaigns.")
 
     # Idea 7: Language Support
-    def idea_7_language_support(self, state_filter=None, district_filter=None):
+    @cached
+    def idea_7_language_support(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
         lang_map = {
             "Karnataka": "Kannada", "Maharashtra": "Marathi", "Gujarat": "Gujarati", 
             "Tamil Nadu": "Tamil", "Kerala": "Malayalam", "Uttar Pradesh": "Hindi",
@@ -295,15 +404,14 @@ class Analyzer:
             "Telangana": "Telugu", "Punjab": "Punjabi", "Odisha": "Odia"
         }
         
-        e_df = self.filter_data(self.loader.enrolment_df, state_filter, district_filter)
-        
         group_col = 'pincode' if district_filter and district_filter != "All" else ('district' if state_filter and state_filter != "All" else 'state')
+        e_df = self._view('enrolment', self._level(group_col, district_filter), state_filter, district_filter, date_from, date_to)
         
-        activity = e_df.groupby(group_col).size().reset_index(name='value').sort_values('value', ascending=False).head(15)
+        activity = self._count(e_df, group_col).reset_index(name='value').sort_values('value', ascending=False).head(15)
         
         labels = activity[group_col].astype(str).tolist()
         if group_col == 'pincode':
-             labels = [self._get_area_name(l) for l in labels]
+             labels = self._labels(labels)
         
         # Determine likely language
         current_lang = "Local/Hindi"
@@ -316,73 +424,95 @@ class Analyzer:
                                      f"High volume {group_col}s requiring {current_lang} support interfaces.", extra_info=extra)
 
     # Idea 8: Center Health Monitor
-    def idea_8_health_monitor(self, state_filter=None, district_filter=None):
-        d_df = self.filter_data(self.loader.demographic_df, state_filter, district_filter)
-        b_df = self.filter_data(self.loader.biometric_df, state_filter, district_filter)
-        
+    @cached
+    def idea_8_health_monitor(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
         # Always Pincode for health monitor
-        d_pin = d_df.groupby('pincode').size()
-        b_pin = b_df.groupby('pincode').size()
+        activity = self._activity('pincode', state_filter, district_filter, date_from, date_to)
         
-        merged = pd.concat([d_pin, b_pin], axis=1, keys=['demo_count', 'bio_count']).fillna(0)
+        merged = activity.groupby('pincode', observed=True)[['demographic_rows', 'biometric_rows']].sum()
+        merged.columns = ['demo_count', 'bio_count']
         faulty_centers = merged[(merged['demo_count'] > 20) & (merged['bio_count'] < 2)].sort_values('demo_count', ascending=False).head(15)
         
-        labels = [self._get_area_name(p) for p in faulty_centers.index]
+        labels = self._labels(faulty_centers.index)
         
         return self._format_response(8, labels, faulty_centers['demo_count'].tolist(), 
                                      f"Identified {len(faulty_centers)} pincodes with high 'Demographic-Only' updates, suggesting biometric device failure.")
 
     # Idea 9: Disaster Relief
-    def idea_9_disaster_planning(self, state_filter=None, district_filter=None):
+    @cached
+    def idea_9_disaster_planning(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
         disaster_districts = ["Cuddalore", "Nagapattinam", "Puri", "Kendrapara", "Darbhanga", "Gorakhpur", "Wayanad", "Chamoli"]
         
-        d_df = self.filter_data(self.loader.demographic_df, state_filter, district_filter)
+        group_col = 'pincode' if district_filter and district_filter != "All" else 'district'
+
+        d_df = self._view('demographic', group_col, state_filter, district_filter, date_from, date_to)
         if not state_filter:
              d_df = d_df[d_df['district'].isin(disaster_districts)]
         
         if d_df.empty: return self._format_response(9, [], [], "No filtered disaster districts found.")
 
-        group_col = 'pincode' if district_filter and district_filter != "All" else 'district'
-
-        district_updates = d_df.groupby(group_col)[['age_5_17', 'age_18_above']].sum().sum(axis=1).sort_values(ascending=False).head(15)
+        district_updates = d_df.groupby(group_col, observed=True)[['age_5_17', 'age_18_above']].sum().sum(axis=1).sort_values(ascending=False).head(15)
         
         labels = district_updates.index.tolist()
         if group_col == 'pincode':
-            labels = [self._get_area_name(l) for l in labels]
+            labels = self._labels(labels)
             
         insight = f"Highest displacement/update activity observed in {labels[0]}." if labels else "No significant movement."
         
         return self._format_response(9, labels, district_updates.values.tolist(), insight)
 
     # Idea 10: Urban Traffic
-    def idea_10_urban_traffic(self, state_filter=None, district_filter=None):
+    @cached
+    def idea_10_urban_traffic(self, state_filter=None, district_filter=None, date_from=None, date_to=None):
         urban_districts = ["Bengaluru", "Mumbai", "Pune", "Chennai", "Hyderabad", "Ahmedabad", "Gurgaon", "Noida", "Kolkata", "Delhi"]
         
-        merged_df = pd.concat([self.loader.enrolment_df, self.loader.demographic_df, self.loader.biometric_df])
-        merged_df = self.filter_data(merged_df, state_filter, district_filter)
+        activity = self._activity('pincode', state_filter, district_filter, date_from, date_to)
         
         if not state_filter and not district_filter:
-            merged_df = merged_df[merged_df['district'].isin(urban_districts)]
+            activity = activity[activity['district'].isin(urban_districts)]
         
         group_col = 'pincode'
         
-        pincode_traffic = merged_df.groupby(group_col).size().sort_values(ascending=False).head(15)
+        rows = activity.groupby(group_col, observed=True)[['enrolment_rows', 'demographic_rows', 'biometric_rows']].sum()
+        pincode_traffic = rows.sum(axis=1).sort_values(ascending=False).head(15)
         
-        labels = [self._get_area_name(l) for l in pincode_traffic.index]
+        labels = self._labels(pincode_traffic.index)
         
         return self._format_response(10, labels, pincode_traffic.values.tolist(), 
                                      f"Highest traffic density observed in {labels[0] if labels else 'N/A'}.")
 
-    def get_centers(self, state_filter=None, district_filter=None, pincode_filter=None, query=None):
+    @cached
+    def get_timeseries(self, dataset, state_filter=None, district_filter=None, pincode_filter=None, freq="daily",
+                       date_from=None, date_to=None):
+        """
+        Daily, weekly or monthly totals of one dataset for a region (the whole
+        country, a state, a district or a pincode), read from the prefix sums
+        of app.data.timeseries. None when the region has no data.
+        """
+        state = state_filter if state_filter and state_filter != "All" else None
+        district = district_filter if district_filter and district_filter != "All" else None
+        pincode = int(pincode_filter) if pincode_filter else None
+        found = self._generation().timeseries[dataset].series(freq, date_from, date_to, state=state,
+                                                       district=district, pincode=pincode)
+        if found is None:
+            return None
+        labels, data = found
+        return {
+            "dataset": dataset,
+            "freq": freq,
+            "region": {"state": state, "district": district, "pincode": pincode},
+            "labels": labels,
+            "data": data,
+            "total": sum(data),
+        }
+
+    @cached
+    def get_centers(self, state_filter=None, district_filter=None, pincode_filter=None, query=None, date_from=None, date_to=None):
         """
         Extract centers from datasets based on filters.
         Since datasets don't have lat/lng or names, we generate stable mocks.
         """
-        df = self.loader.enrolment_df
-        if state_filter and state_filter != 'All': 
-            df = df[df['state'] == state_filter]
-        if district_filter and district_filter != 'All': 
-            df = df[df['district'] == district_filter]
+        df = self._view('enrolment', 'pincode', state_filter, district_filter, date_from, date_to)
         if pincode_filter: 
             df = df[df['pincode'].astype(str) == str(pincode_filter)]
             
@@ -395,36 +525,41 @@ class Analyzer:
             ]
         
         # Aggregate by pincode to treat each pincode as a "hub" or group centers by pincode
-        grp = df.groupby(['state', 'district', 'pincode']).size().reset_index(name='activity')
+        grp = self._count(df, ['state', 'district', 'pincode']).reset_index(name='activity')
         grp = grp.sort_values('activity', ascending=False).head(100) # Increased limit for search
         
+        names = self._labels(grp['pincode'])
+        coords = self.loader.pincodes.coordinates(grp['pincode'])
+        
         centers = []
-        for _, row in grp.iterrows():
+        for (_, row), area, (lat, lng) in zip(grp.iterrows(), names, coords):
             pin = str(row['pincode'])
-            # Generate stable mock lat/lng based on pincode if not in map
-            # This is a hack for the hackathon to show "real" data spreading
-            h = hash(pin)
-            lat_offset = (h % 1000) / 5000.0
-            lng_offset = ((h // 1000) % 1000) / 5000.0
-            
-            # Base coordinates for states/districts (simplified)
-            base_coords = {
-                "Gujarat": [23.0225, 72.5714],
-                "Karnataka": [12.9716, 77.5946],
-                "Maharashtra": [19.0760, 72.8777],
-                "Uttar Pradesh": [26.8467, 80.9462],
-                "Delhi": [28.6139, 77.2090],
-                "Rajasthan": [26.9124, 75.7873]
-            }
-            base = base_coords.get(row['state'], [20.5937, 78.9629])
+            if np.isnan(lat):
+                # Generate stable mock lat/lng based on pincode if not in the directory
+                # This is a hack for the hackathon to show "real" data spreading
+                h = hash(pin)
+                lat_offset = (h % 1000) / 5000.0
+                lng_offset = ((h // 1000) % 1000) / 5000.0
+                
+                # Base coordinates for states/districts (simplified)
+                base_coords = {
+                    "Gujarat": [23.0225, 72.5714],
+                    "Karnataka": [12.9716, 77.5946],
+                    "Maharashtra": [19.0760, 72.8777],
+                    "Uttar Pradesh": [26.8467, 80.9462],
+                    "Delhi": [28.6139, 77.2090],
+                    "Rajasthan": [26.9124, 75.7873]
+                }
+                base = base_coords.get(row['state'], [20.5937, 78.9629])
+                lat, lng = base[0] + lat_offset, base[1] + lng_offset
             
             centers.append({
-                "name": f"Aadhaar Center - {self._get_area_name(pin)}",
+                "name": f"Aadhaar Center - {area}",
                 "state": row['state'],
                 "district": row['district'],
                 "pincode": pin,
-                "lat": base[0] + lat_offset,
-                "lng": base[1] + lng_offset,
+                "lat": float(lat),
+                "lng": float(lng),
                 "address": f"Main Seva Kendra, Near Post Office, {row['district']}, {row['state']} - {pin}",
                 "phone": f"1800-300-{pin[:4]}",
                 "activity": int(row['activity'])
@@ -432,42 +567,30 @@ class Analyzer:
             
         return centers
 
-    def get_category_analysis(self, category, state_filter=None, district_filter=None):
+    @cached
+    def get_category_analysis(self, category, state_filter=None, district_filter=None, date_from=None, date_to=None):
         """
         Generic analysis for Enrolment, Demographic, Biometric categories.
         Returns Top/Bottom performers, Reasons (Why), and Government Solutions.
         """
         category = category.lower()
         
-        df = None
+        # The cube carries the sum over all age groups in its 'total' column
         if category == 'enrolment':
-            df = self.loader.enrolment_df
-            # Sum all age groups for total enrolment
-            df['total_val'] = df['age_0_5'] + df['age_5_17'] + df['age_18_above']
             metric_label = "Total Enrolment"
             solution = "Strategically deploy mobile Aadhaar vans and increase operator strength in identified high-activity districts to ensure 100% service coverage."
         
         elif category == 'demographic':
-            df = self.loader.demographic_df
-            df['total_val'] = df['age_5_17'] + df['age_18_above']
             metric_label = "Demographic Updates"
             solution = "Mandatory deployment of multi-lingual support interfaces and local language translators at regional hubs to reduce error rates."
         
         elif category == 'biometric':
-            df = self.loader.biometric_df
-            df['total_val'] = df['age_5_17'] + df['age_18_above']
             metric_label = "Biometric Updates"
             solution = "Organize Mandatory Biometric Update Camps synchronized with local fair-price shops and schools in low-compliance areas."
         
         else:
             return {"error": "Invalid Category"}
 
-        # Filter Data
-        df = self.filter_data(df, state_filter, district_filter)
-        
-        if df.empty:
-            return {"error": "No data available"}
-
         # Determine Grouping
         if district_filter and district_filter != "All":
             group_col = 'pincode'
@@ -479,8 +602,14 @@ class Analyzer:
             group_col = 'state'
             entity_label = "State"
 
+        # Filter Data
+        df = self._view(category, group_col, state_filter, district_filter, date_from, date_to)
+        
+        if df.empty:
+            return {"error": "No data available"}
+
         # Aggregate
-        agg = df.groupby(group_col)['total_val'].sum().sort_values(ascending=False)
+        agg = df.groupby(group_col, observed=True)['total'].sum().sort_values(ascending=False)
         total_volume = int(agg.sum())
         
         if agg.empty:
@@ -489,12 +618,12 @@ class Analyzer:
         # Top Performer
         top_name = agg.index[0]
         top_val = int(agg.iloc[0])
-        top_formatted = self._get_area_name(top_name) if group_col == 'pincode' else top_name
+        top_formatted = self._labels([top_name])[0] if group_col == 'pincode' else top_name
         
         # Bottom Performer
         bottom_name = agg.index[-1]
         bottom_val = int(agg.iloc[-1])
-        bottom_formatted = self._get_area_name(bottom_name) if group_col == 'pincode' else bottom_name
+        bottom_formatted = self._labels([bottom_name])[0] if group_col == 'pincode' else bottom_name
 
         # Average for comparison
         avg_val = agg.mean()
@@ -546,15 +675,16 @@ class Analyzer:
             
             import random
             seed = sum(ord(c) for c in (top_name if is_high else bottom_name))
-            random.seed(seed)
+            # A private generator: reseeding the global one is not thread-safe
+            rng = random.Random(seed)
             
             if is_high:
-                base_reason = random.choice(cat_reasons['high'])
+                base_reason = rng.choice(cat_reasons['high'])
                 if deviation > 2.5:
                     return f"Critical Peak: {base_reason} Regional volume is {deviation:.1f}x higher than the state average."
                 return base_reason
             else:
-                base_reason = random.choice(cat_reasons['low'])
+                base_reason = rng.choice(cat_reasons['low'])
                 if val == 0:
                     return "Operational Halt: Zero activity recorded. Suggests a total system blackout or synchronization delay."
                 if deviation < 0.2:
@@ -566,7 +696,7 @@ class Analyzer:
 
         # Labels for Chart (Top 10)
         chart_data = agg.head(10)
-        chart_labels = [self._get_area_name(i) if group_col == 'pincode' else i for i in chart_data.index]
+        chart_labels = self._labels(chart_data.index) if group_col == 'pincode' else list(chart_data.index)
 
         # Add Bottom Performer to chart data if not already there, to show "comparison"
         # However, for the main chart, we usually want Top 10. 
@@ -597,17 +727,13 @@ class Analyzer:
             "active_regions": len(agg)
         }
 
-    def get_regional_context(self, category, region_name, state_filter=None, district_filter=None):
+    @cached
+    def get_regional_context(self, category, region_name, state_filter=None, district_filter=None, date_from=None, date_to=None):
         """
         Gather context for a specific region (bar clicked) to be sent to Gemini.
         """
         category = category.lower()
-        df = None
-        if category == 'enrolment': df = self.loader.enrolment_df
-        elif category == 'demographic': df = self.loader.demographic_df
-        elif category == 'biometric': df = self.loader.biometric_df
-        
-        if df is None: return None
+        if category not in ('enrolment', 'demographic', 'biometric'): return None
 
         # Determine level
         if district_filter and district_filter != "All":
@@ -616,17 +742,27 @@ class Analyzer:
             pincode = region_name
             if "(" in region_name and ")" in region_name:
                 pincode = region_name.split("(")[-1].split(")")[0]
-            
-            reg_data = df[df['pincode'].astype(str) == str(pincode)]
-            level = "Pincode"
+            level, key = "Pincode", pincode.strip()
         elif state_filter and state_filter != "All":
-            reg_data = df[df['district'] == region_name]
-            level = "District"
+            level, key = "District", region_name
         else:
-            reg_data = df[df['state'] == region_name]
-            level = "State"
+            level, key = "State", region_name
+
+        if date_from is None and date_to is None:
+            # Whole-history sums are read straight from the region tree
+            metrics = self._generation().regions.lookup(category, level.lower(), key)
+        else:
+            df = self._view(category, level.lower(), date_from=date_from, date_to=date_to)
+            if level == "Pincode":
+                reg_data = df[df['pincode'].astype(str) == str(key)]
+            else:
+                reg_data = df[df[level.lower()] == key]
+            metrics = None if reg_data.empty else {
+                col: int(reg_data[col].sum()) if col in reg_data.columns else None
+                for col in ('age_0_5', 'age_5_17', 'age_18_above')
+            }
 
-        if reg_data.empty: return {"error": "No data for region"}
+        if metrics is None: return {"error": "No data for region"}
 
         # Calculate metrics
         summary = {
@@ -634,9 +770,9 @@ class Analyzer:
             "level": level,
             "category": category.capitalize(),
             "metrics": {
-                "age_0_5": int(reg_data['age_0_5'].sum()) if 'age_0_5' in reg_data.columns else 0,
-                "age_5_17": int(reg_data['age_5_17'].sum()),
-                "age_18_above": int(reg_data['age_18_above'].sum())
+                "age_0_5": metrics['age_0_5'] or 0,
+                "age_5_17": metrics['age_5_17'] or 0,
+                "age_18_above": metrics['age_18_above'] or 0
             }
         }
         summary['total'] = summary['metrics']['age_0_5'] + summary['metrics']['age_5_17'] + summary['metrics']['age_18_above']
@@ -0,0 +1,217 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.data import schema
+from app.data.dates import MISSING_DAY, to_days
+
+# Scales the MAD to a standard deviation for normally distributed counts
+MAD_SCALE = 1.4826
+# Cells scored per numpy pass; bounds the (cells x window) scratch arrays
+CHUNK = 100000
+
+
+def daily_cells(df, ordered=True):
+    """
+    One row per (state, district, pincode, day) of a frame with the day's
+    total over the age buckets in 'count'. Cells come out per series, by day,
+    and 'series' numbers the (state, district, pincode) series.
+    `ordered` says the frame is already sorted with sort_by_region(), which
+    saves the sort.
+    """
+    days = to_days(df[schema.DATE_COLUMN])
+    measures = [c for c in schema.COUNT_COLUMNS if c in df.columns]
+    totals = df[measures].to_numpy(dtype="int64").sum(axis=1) if measures else np.zeros(len(df), dtype="int64")
+    s_codes = df["state"].cat.codes.to_numpy()
+    d_codes = df["district"].cat.codes.to_numpy()
+    pincodes = df["pincode"].to_numpy()
+
+    order = None if ordered else np.lexsort((days, pincodes, d_codes, s_codes))
+    if order is not None:
+        days, totals, s_codes, d_codes, pincodes = (a[order] for a in (days, totals, s_codes, d_codes, pincodes))
+
+    if not len(days):
+        starts = np.zeros(0, dtype=np.int64)
+    else:
+        change = ((s_codes[1:] != s_codes[:-1]) | (d_codes[1:] != d_codes[:-1])
+                  | (pincodes[1:] != pincodes[:-1]) | (days[1:] != days[:-1]))
+        starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+    first = np.ones(len(starts), dtype=bool)
+    first[1:] = ((s_codes[starts[1:]] != s_codes[starts[:-1]]) | (d_codes[starts[1:]] != d_codes[starts[:-1]])
+                 | (pincodes[starts[1:]] != pincodes[starts[:-1]]))
+    rows = starts if order is None else order[starts]
+    cells = pd.DataFrame({
+        "state": df["state"].take(rows).reset_index(drop=True),
+        "district": df["district"].take(rows).reset_index(drop=True),
+        "pincode": pincodes[starts],
+        "day": days[starts],
+        "count": np.add.reduceat(totals, starts) if len(starts) else totals[:0],
+        "series": np.cumsum(first),
+    })
+    return cells[cells["day"] != MISSING_DAY].reset_index(drop=True)
+
+
+def _series_starts(cells):
+    """First row of every series of a daily_cells() frame."""
+    series = cells["series"].to_numpy()
+    return np.flatnonzero(np.concatenate(([True], series[1:] != series[:-1]))) if len(series) else series
+
+
+def _series_index(cells, starts, target):
+    """
+    (state code, district code, pincode) of the series starting at `starts`,
+    with the codes taken in the categories of `target`'s columns (-1 where
+    `target` has no such name), as an index to match series of two frames.
+    """
+    keys = []
+    for col in ("state", "district"):
+        values = cells[col]
+        codes = values.cat.codes.to_numpy()[starts]
+        # Old categories -> codes among `target`'s categories; one lookup per distinct name
+        mapping = target[col].cat.categories.get_indexer(values.cat.categories)
+        keys.append(np.where(codes >= 0, mapping[codes], -1))
+    keys.append(cells["pincode"].to_numpy()[starts])
+    return pd.MultiIndex.from_arrays(keys)
+
+
+def _row_median(values, n):
+    # NaNs sort last, so the n valid values of each row are its first n
+    values = np.sort(values, axis=1)
+    rows = np.arange(len(values))
+    return (values[rows, (n - 1) // 2] + values[rows, n // 2]) / 2
+
+
+def baselines(series, days, counts, targets, window, min_periods):
+    """
+    Median and MAD of the counts of the same series within the `window`
+    days before each target cell (the cell itself excluded). NaN where fewer
+    than `min_periods` such days have data. Cells must be ordered by series,
+    then day, so the history of a cell is the run of cells right before it.
+    """
+    median = np.full(len(targets), np.nan)
+    mad = np.full(len(targets), np.nan)
+    offsets = np.arange(-window, 0)
+    counts = counts.astype("float64")
+    for lo in range(0, len(targets), CHUNK):
+        t = targets[lo:lo + CHUNK]
+        idx = t[:, None] + offsets
+        valid = idx >= 0
+        idx = np.where(valid, idx, 0)
+        valid &= (series[idx] == series[t][:, None]) & (days[idx] >= (days[t] - window)[:, None])
+        n = valid.sum(axis=1)
+        enough = n >= max(min_periods, 1)
+        if not enough.any():
+            continue
+        n = n[enough]
+        history = np.where(valid[enough], counts[idx[enough]], np.nan)
+        m = _row_median(history, n)
+        median[lo:lo + CHUNK][enough] = m
+        mad[lo:lo + CHUNK][enough] = _row_median(np.abs(history - m[:, None]), n)
+    return median, mad
+
+
+class AnomalyIndex:
+    """
+    Rolling per-pincode baselines of one dataset's daily totals, scored for
+    every (state, district, pincode, day) cell once per published frame.
+
+    A cell is an anomaly when its robust z-score against the median/MAD of
+    the same pincode over the previous `window` days reaches `threshold` and
+    it has at least `min_count` updates. Queries only filter the flagged
+    cells, so they never re-group the history.
+
+    Built with `previous` (the index of an earlier frame of the dataset),
+    the cells of every series none of whose earlier days changed are carried
+    over up to the previous last day, and only the new days and the series
+    the new shards touched are scored.
+    """
+
+    def __init__(self, df, ordered=True, previous=None, window=None, min_periods=None, threshold=None,
+                 min_count=None):
+        self.window = window or int(os.getenv("ANOMALY_WINDOW", "28"))
+        self.min_periods = min_periods or int(os.getenv("ANOMALY_MIN_PERIODS", "3"))
+        self.threshold = threshold or float(os.getenv("ANOMALY_THRESHOLD", "3.5"))
+        self.min_count = min_count if min_count is not None else int(os.getenv("ANOMALY_MIN_COUNT", "10"))
+
+        cells = daily_cells(df, ordered)
+        series = cells["series"].to_numpy()
+        days = cells["day"].to_numpy()
+        counts = cells["count"].to_numpy()
+
+        median = np.full(len(cells), np.nan)
+        mad = np.full(len(cells), np.nan)
+        targets = np.arange(len(cells))
+        carried = self._carry_over(previous, cells)
+        if carried is not None:
+            known, old_median, old_mad = carried
+            median[known], mad[known] = old_median, old_mad
+            targets = np.flatnonzero(~known)
+        median[targets], mad[targets] = baselines(series, days, counts, targets, self.window, self.min_periods)
+        self.scored = len(targets)
+
+        scale = np.maximum(MAD_SCALE * np.nan_to_num(mad), np.maximum(0.1 * np.nan_to_num(median), 1.0))
+        cells["median"] = median
+        cells["mad"] = mad
+        cells["score"] = (counts - median) / scale
+        self.cells = cells
+        flagged = (cells["score"] >= self.threshold) & (cells["count"] >= self.min_count)
+        self.flagged = cells[flagged.to_numpy()].sort_values(["score", "count"], ascending=False)
+        self.last_day = int(days.max()) if len(days) else None
+
+    def _carry_over(self, previous, cells):
+        """
+        (mask of cells already scored by `previous`, their medians, their
+        MADs), or None when `previous` cannot be reused (other settings).
+        Series are matched on integer keys (category codes translated to
+        this frame's categories, pincode) and compared cell by cell; a series
+        is carried over up to the previous last day only when none of those
+        cells changed, so only the series the new shards touch are rescored.
+        """
+        if previous is None or previous.last_day is None or \
+                (previous.window, previous.min_periods) != (self.window, self.min_periods):
+            return None
+        old = previous.cells
+        old_starts, new_starts = _series_starts(old), _series_starts(cells)
+        match = _series_index(old, old_starts, cells).get_indexer(_series_index(cells, new_starts, cells))
+
+        days = cells["day"].to_numpy()
+        old_len = np.diff(np.append(old_starts, len(old)))
+        new_len = np.diff(np.append(new_starts, len(cells)))
+        before = days <= previous.last_day
+        known_len = np.add.reduceat(before.astype(np.int64), new_starts) if len(new_starts) else new_len
+        same = (match >= 0) & (known_len == old_len[match])
+
+        # Position of every cell in its series, and the same position in the old series
+        series = np.repeat(np.arange(len(new_starts)), new_len)
+        candidate = same[series] & before
+        old_rows = old_starts[match[series[candidate]]] + (np.flatnonzero(candidate) - new_starts[series[candidate]])
+        changed = (old["day"].to_numpy()[old_rows] != days[candidate]) | \
+                  (old["count"].to_numpy()[old_rows] != cells["count"].to_numpy()[candidate])
+        same[series[candidate][changed]] = False
+
+        known = same[series] & before
+        old_rows = old_rows[same[series[candidate]]]
+        return known, old["median"].to_numpy()[old_rows], old["mad"].to_numpy()[old_rows]
+
+    def anomalies(self, state=None, district=None, date_from=None, date_to=None):
+        """Flagged cells of a region and date window (day ordinals), most anomalous first."""
+        df = self.flagged
+        if state:
+            df = df[df["state"] == state]
+        if district:
+            df = df[df["district"] == district]
+        if date_from is not None:
+            df = df[df["day"] >= date_from]
+        if date_to is not None:
+            df = df[df["day"] <= date_to]
+        return df.iloc[:]
+
+    def stats(self):
+        return {
+            "cells": len(self.cells),
+            "anomalies": len(self.flagged),
+            "last_scored": self.scored,
+            "window_days": self.window,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,141 @@
+import pandas as pd
+
+from app.data import schema
+from app.data.region_index import intersect, take
+
+# Region levels of the cube, coarsest first, with the keys of each level
+LEVELS = {
+    "state": ["state"],
+    "district": ["state", "district"],
+    "pincode": ["state", "district", "pincode"],
+}
+
+
+def rollup(df, keys):
+    """
+    Sums the counters of `df` per `keys`, plus their total over all age
+    buckets in schema.TOTAL_COLUMN and the number of source rows in
+    schema.ROWS_COLUMN. Returns a flat frame (keys as columns) sorted by keys.
+    """
+    measures = [c for c in schema.COUNT_COLUMNS if c in df.columns]
+    grouped = df.groupby(keys, observed=True)
+    out = grouped[measures].sum()
+    out[schema.TOTAL_COLUMN] = out[measures].sum(axis=1)
+    if schema.ROWS_COLUMN in df.columns:
+        out[schema.ROWS_COLUMN] = grouped[schema.ROWS_COLUMN].sum()
+    else:
+        out[schema.ROWS_COLUMN] = grouped.size()
+    return out.reset_index()
+
+
+class Cube:
+    """
+    Pre-aggregated counters of one dataset at pincode, district and state
+    level, built once per published frame. Region queries without a date
+    window are answered from these rollups (a few thousand cells at most)
+    instead of re-grouping the row-level frame on every request; date
+    windows aggregate only the rows inside the window, found through the
+    date and region indexes.
+
+    Everything handed out is a new frame object (sharing the data under
+    copy-on-write), so a caller assigning a column can never alter the
+    published frames or rollups other requests read.
+    """
+
+    def __init__(self, df, dates, regions):
+        self.base = df
+        self.dates = dates
+        self.regions = regions
+        finest = rollup(df, LEVELS["pincode"])
+        self.rollups = {"pincode": finest}
+        # Coarser levels are rolled up from the finer one, not from the rows
+        self.rollups["district"] = rollup(finest, LEVELS["district"])
+        self.rollups["state"] = rollup(self.rollups["district"], LEVELS["state"])
+
+    def view(self, level, state=None, district=None, date_from=None, date_to=None):
+        """
+        Cells of one level ("state", "district", "pincode", or "date" for the
+        row-level frame), restricted to a region and date window.
+        """
+        if level == "date":
+            return self.rows(state, district, date_from, date_to)
+        if date_from is not None or date_to is not None:
+            return rollup(self.rows(state, district, date_from, date_to), LEVELS[level])
+
+        df = self.rollups[level].iloc[:]
+        if state:
+            df = df[df["state"] == state]
+        if district:
+            df = df[df["district"] == district]
+        return df
+
+    def rows(self, state=None, district=None, date_from=None, date_to=None):
+        """Row-level frame restricted to a region and date window; a view where possible."""
+        selection = self.regions.rows(state, district)
+        if date_from is not None or date_to is not None:
+            selection = intersect(selection, self.dates.rows(date_from, date_to))
+        return take(self.base, selection) if selection is not None else self.base.iloc[:]
+
+    def chunks(self, size, state=None, district=None, date_from=None, date_to=None):
+        """
+        The rows of rows() as consecutive frames of at most `size` rows, so a
+        large selection can be streamed without materializing all of it.
+        """
+        selection = self.regions.rows(state, district)
+        if date_from is not None or date_to is not None:
+            selection = intersect(selection, self.dates.rows(date_from, date_to))
+        if selection is None:
+            selection = slice(0, len(self.base))
+        if isinstance(selection, slice):
+            for start in range(selection.start, selection.stop, size):
+                yield self.base.iloc[start:min(start + size, selection.stop)]
+        else:
+            for start in range(0, len(selection), size):
+                yield self.base.take(selection[start:start + size])
+
+    def size(self):
+        return {level: len(df) for level, df in self.rollups.items()}
+
+
+def align(views, keys):
+    """
+    Puts the cells of several datasets side by side: one row per `keys`
+    value, with '<dataset>_total' and '<dataset>_rows' columns per dataset
+    (0 where a dataset has no activity).
+    """
+    parts = []
+    for name, df in views.items():
+        part = df.set_index(keys)[[schema.TOTAL_COLUMN, schema.ROWS_COLUMN]]
+        parts.append(part.rename(columns=lambda col: f"{name}_{col}"))
+    out = pd.concat(parts, axis=1).fillna(0).astype("int64").sort_index().reset_index()
+    for key in keys:
+        if key in schema.READ_DTYPES:
+            out[key] = out[key].astype("category")
+    return out
+
+
+class ActivityTable:
+    """
+    All datasets aligned per region cell, built once per generation from the
+    cubes, so cross-dataset analyses are one grouped pass over a single
+    frame instead of per-request concatenation of the datasets.
+    """
+
+    def __init__(self, cubes):
+        self.cubes = cubes
+        self.levels = {
+            level: align({name: cube.rollups[level] for name, cube in cubes.items()}, keys)
+            for level, keys in LEVELS.items()
+        }
+
+    def view(self, level, state=None, district=None, date_from=None, date_to=None):
+        if date_from is not None or date_to is not None:
+            return align({name: cube.view(level, state, district, date_from, date_to)
+                          for name, cube in self.cubes.items()}, LEVELS[level])
+
+        df = self.levels[level].iloc[:]
+        if state:
+            df = df[df["state"] == state]
+        if district:
+            df = df[df["district"] == district]
+        return df
@@ -0,0 +1,85 @@
+import datetime
+
+import numpy as np
+
+# Dates are handled as day ordinals: days since 1970-01-01 in an int32.
+# Missing/unparseable dates get MISSING_DAY, which sorts before every real day
+# and is left out of every window.
+MISSING_DAY = int(np.iinfo(np.int32).min)
+EPOCH = datetime.date(1970, 1, 1)
+
+# Accepted spellings of a from/to request parameter: ISO (date pickers) and
+# the dd-mm-yyyy format the datasets use
+INPUT_FORMATS = ("%Y-%m-%d", "%d-%m-%Y")
+
+
+class DateWindowError(ValueError):
+    """A from/to/days parameter that cannot be turned into a date window."""
+
+
+def to_days(dates):
+    """datetime64 Series/array -> int32 day ordinals, NaT -> MISSING_DAY."""
+    values = np.asarray(dates, dtype="datetime64[D]")
+    days = np.full(len(values), MISSING_DAY, dtype=np.int32)
+    valid = ~np.isnat(values)
+    days[valid] = values[valid].astype(np.int64)
+    return days
+
+
+def parse_day(text):
+    for fmt in INPUT_FORMATS:
+        try:
+            return (datetime.datetime.strptime(text.strip(), fmt).date() - EPOCH).days
+        except ValueError:
+            continue
+    raise DateWindowError(f"Invalid date '{text}', expected YYYY-MM-DD or DD-MM-YYYY")
+
+
+def day_to_iso(day):
+    return (EPOCH + datetime.timedelta(days=int(day))).isoformat()
+
+
+class DateIndex:
+    """
+    Sorted index over the date column of one frame, so a date window is two
+    binary searches instead of a comparison over every row.
+
+    Frames sorted by date are sliced in place; otherwise the index keeps the
+    row order that sorts the days and hands back the matching rows in their
+    original order, so results do not depend on whether a window was applied.
+    """
+
+    def __init__(self, dates):
+        days = to_days(dates)
+        self.size = len(days)
+        if self.size < 2 or bool(np.all(days[1:] >= days[:-1])):
+            self.order = None
+            self.sorted_days = days
+        else:
+            self.order = np.argsort(days, kind="stable").astype(np.int32)
+            self.sorted_days = days[self.order]
+
+    def bounds(self):
+        """(first, last) day ordinal with data, or (None, None)."""
+        start = np.searchsorted(self.sorted_days, MISSING_DAY, side="right")
+        if start >= self.size:
+            return None, None
+        return int(self.sorted_days[start]), int(self.sorted_days[-1])
+
+    def rows(self, start=None, end=None):
+        """Positions of the rows with start <= day <= end: a slice, or a sorted int array."""
+        lo = np.searchsorted(self.sorted_days, MISSING_DAY if start is None else start - 1, side="right")
+        hi = self.size if end is None else np.searchsorted(self.sorted_days, end, side="right")
+        if self.order is None:
+            return slice(int(lo), int(max(lo, hi)))
+        return np.sort(self.order[lo:hi])
+
+    def slice(self, df, start=None, end=None):
+        if start is None and end is None:
+            return df
+        rows = self.rows(start, end)
+        if isinstance(rows, slice):
+            return df.iloc[rows]
+        if len(rows) == self.size:
+            return df
+        return df.take(rows)
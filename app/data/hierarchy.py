@@ -0,0 +1,104 @@
+import json
+
+from app.data import schema
+from app.data.cube import LEVELS
+
+
+class RegionTree:
+    """
+    State -> district -> pincode hierarchy of all datasets, built once per
+    generation from the ActivityTable. Every node carries the totals of each
+    dataset. Dropdown lists, drilldowns and regional lookups are dictionary
+    reads, and the whole tree is serialized once into `document` (JSON).
+    """
+
+    def __init__(self, activity):
+        self.datasets = list(activity.cubes)
+        self.rows, self.metrics = {}, {}
+        for level, keys in LEVELS.items():
+            cells = activity.levels[level]
+            self.rows[level] = {
+                name: cells[f"{name}_rows"].to_numpy() for name in self.datasets
+            }
+            # Age-bucket sums per cell and dataset, aligned with the activity rows
+            self.metrics[level] = {}
+            for name, cube in activity.cubes.items():
+                rollup = cube.rollups[level]
+                measures = [c for c in schema.COUNT_COLUMNS if c in rollup.columns]
+                names = {key: str for key in keys if key != "pincode"}
+                aligned = cells[keys].astype(names).merge(rollup[keys + measures].astype(names), on=keys, how="left")
+                self.metrics[level][name] = {
+                    col: aligned[col].fillna(0).to_numpy(dtype="int64") if col in measures else None
+                    for col in schema.COUNT_COLUMNS
+                }
+
+        states = activity.levels["state"]
+        self.state_index = {state: row for row, state in enumerate(states["state"].astype(str))}
+        districts = activity.levels["district"]
+        self.district_index = {}
+        self.children = {state: [] for state in self.state_index}
+        for row, (state, district) in enumerate(zip(districts["state"].astype(str), districts["district"].astype(str))):
+            self.district_index.setdefault(district, []).append(row)
+            self.children[state].append(district)
+        pincodes = activity.levels["pincode"]
+        self.pincode_index = {}
+        for row, pincode in enumerate(pincodes["pincode"].tolist()):
+            self.pincode_index.setdefault(int(pincode), []).append(row)
+
+        self.document = json.dumps(self._tree(activity))
+
+    def _tree(self, activity):
+        totals = {level: [cells[f"{name}_total"].tolist() for name in self.datasets]
+                  for level, cells in activity.levels.items()}
+
+        def node_totals(level, row):
+            return [column[row] for column in totals[level]]
+
+        states = []
+        by_state = {}
+        for state, row in self.state_index.items():
+            node = {"name": state, "totals": node_totals("state", row), "districts": []}
+            states.append(node)
+            by_state[state] = node
+
+        districts = activity.levels["district"]
+        by_district = {}
+        for row, (state, district) in enumerate(zip(districts["state"].astype(str), districts["district"].astype(str))):
+            node = {"name": district, "totals": node_totals("district", row), "pincodes": []}
+            by_state[state]["districts"].append(node)
+            by_district[(state, district)] = node
+
+        pincodes = activity.levels["pincode"]
+        keys = zip(pincodes["state"].astype(str), pincodes["district"].astype(str), pincodes["pincode"].tolist())
+        for row, (state, district, pincode) in enumerate(keys):
+            by_district[(state, district)]["pincodes"].append(
+                {"pincode": int(pincode), "totals": node_totals("pincode", row)})
+        return {"datasets": self.datasets, "states": states}
+
+    def states(self):
+        """Sorted state names."""
+        return list(self.state_index)
+
+    def districts(self, state):
+        """Sorted district names of a state ([] for an unknown state)."""
+        return list(self.children.get(state, []))
+
+    def lookup(self, name, level, key):
+        """
+        Age-bucket sums of dataset `name` for a state, a district name (across
+        states) or a pincode; None when the dataset has no rows there.
+        """
+        if level == "state":
+            rows = [self.state_index[key]] if key in self.state_index else []
+        elif level == "district":
+            rows = self.district_index.get(key, [])
+        else:
+            try:
+                rows = self.pincode_index.get(int(key), [])
+            except (TypeError, ValueError):
+                rows = []
+        rows = [row for row in rows if self.rows[level][name][row] > 0]
+        if not rows:
+            return None
+        metrics = self.metrics[level][name]
+        return {col: int(values[rows].sum()) if values is not None else None for col, values in metrics.items()}
@@ -2,56 +2,512 @@
 import pandas as pd
 import os
 import glob
+import hashlib
+import multiprocessing
+import shutil
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from app.data import schema, validate
+from app.data.anomaly import AnomalyIndex, daily_cells
+from app.data.cube import ActivityTable, Cube
+from app.data.dates import DateIndex
+from app.data.hierarchy import RegionTree
+from app.data.normalize import RegionNormalizer
+from app.data.pincodes import PincodeDirectory
+from app.data.region_index import RegionIndex, sort_by_region
+from app.data.snapshot import SnapshotCache, fingerprint_files
+from app.data.timeseries import TimeSeriesIndex
+
+# (attribute prefix, subdirectory under Dataset/, label used in log output)
+DATASETS = [
+    ("enrolment", "aadhar_enrolment", "Enrolment"),
+    ("demographic", "aadhar_demographic", "Demographic"),
+    ("biometric", "aadhar_biometric", "Biometric"),
+]
+
+# Datasets scored for spikes; only the demographic baselines are read (Integrity
+# Shield), and each AnomalyIndex holds per-cell float arrays private to the process
+ANOMALY_DATASETS = ("demographic",)
+
+# Start method of the parsing pool. Reloads run on a thread of a threaded server
+# worker, and a forked child would inherit every lock another thread holds at that
+# moment; forkserver/spawn children start from a fresh interpreter instead
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+# One fully built set of frames. Generations are never modified after they are
+# published; a reload builds a new one and swaps the reference in one step.
+#   frames: {dataset: DataFrame}, shards: {dataset: {path: (size, mtime_ns)}},
+#   dates: {dataset: DateIndex over the frame's date column},
+#   cubes: {dataset: Cube of pre-aggregated counters},
+#   activity: ActivityTable aligning the cubes of all datasets,
+#   anomalies: {dataset in ANOMALY_DATASETS: AnomalyIndex of per-pincode daily baselines},
+#   timeseries: {dataset: TimeSeriesIndex of daily totals per region},
+#   regions: RegionTree of all datasets, built with the ActivityTable,
+#   tag: hash of every shard's (name, size, mtime) and the loader settings, equal
+#   in every process serving the same data; modified: when this process first
+#   published that tag (its Last-Modified), so it moves with every tag change,
+#   including alias or mode changes that leave the shards as they are
+Generation = namedtuple("Generation", ["version", "frames", "shards", "loaded_at", "dates", "cubes", "activity",
+                                       "anomalies", "timeseries", "regions", "tag", "modified"])
+
+
+def _read_shard(filename):
+    """
+    Parses and validates one CSV shard. Returns (clean rows, quarantined rows
+    or None, validation counters, error). Runs inside pool workers, so it must
+    stay top-level.
+    """
+    try:
+        df = pd.read_csv(filename, index_col=None, header=0, dtype=schema.READ_DTYPES)
+        return validate.split(df) + (None,)
+    except Exception as e:
+        return None, None, None, e
+
+
+def _aggregate_shard(filename, chunksize):
+    """
+    Streams one CSV shard in chunks and folds every chunk into per-cell
+    aggregates straight away, so peak memory follows the chunk size and the
+    number of distinct cells rather than the shard size. Top-level for the pool.
+    """
+    try:
+        partials, pending, rejected, counters = [], 0, [], {}
+        for i, chunk in enumerate(pd.read_csv(filename, index_col=None, header=0, dtype=schema.READ_DTYPES, chunksize=chunksize)):
+            chunk, bad, counters[i] = validate.split(chunk)
+            if bad is not None:
+                rejected.append(bad)
+            partials.append(schema.fold(chunk))
+            pending += len(partials[-1])
+            if pending > chunksize:
+                partials = [schema.fold(pd.concat(schema.unify_categories(partials), ignore_index=True))]
+                pending = len(partials[0])
+        rejected = pd.concat(rejected, ignore_index=True) if rejected else None
+        if not partials:
+            return pd.DataFrame(), rejected, validate.merge_counters(counters), None
+        df = schema.fold(pd.concat(schema.unify_categories(partials), ignore_index=True))
+        return df, rejected, validate.merge_counters(counters), None
+    except Exception as e:
+        return None, None, None, e
+
 
 class DataLoader:
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, snapshot_dir=None, workers=None, mode=None, chunksize=None, store=None):
         self.data_dir = data_dir
-        self.enrolment_df = None
-        self.demographic_df = None
-        self.biometric_df = None
-        
-    def load_data(self):
-        """Loads data from the three subdirectories."""
-        print("Loading Enrolment Data...")
-        self.enrolment_df = self._load_csvs_from_dir(os.path.join(self.data_dir, "aadhar_enrolment"))
-        self._normalize_enrolment()
-        
-        print("Loading Demographic Data...")
-        self.demographic_df = self._load_csvs_from_dir(os.path.join(self.data_dir, "aadhar_demographic"))
-        self._normalize_demographic()
-        
-        print("Loading Biometric Data...")
-        self.biometric_df = self._load_csvs_from_dir(os.path.join(self.data_dir, "aadhar_biometric"))
-        self._normalize_biometric()
+        # Currently published Generation; None until load_data() has run
+        self.current = None
+        self._reload_lock = threading.Lock()
+        # Columnar snapshot of the normalized frames, keyed by shard fingerprints
+        self.snapshot = SnapshotCache(snapshot_dir or os.path.join(data_dir, ".snapshot"))
+        # Alias tables for state/district names; region_aliases.json extends the defaults
+        self.normalizer = RegionNormalizer.from_file(os.path.join(data_dir, "region_aliases.json"))
+        # Area names and coordinates per pincode, from pincode_directory.csv
+        self.pincodes = PincodeDirectory.from_file(os.path.join(data_dir, "pincode_directory.csv"))
+        # {dataset: {"state"|"district": {canonical name: raw spellings collapsed into it}}}
+        self.normalization_report = {}
+        # {dataset: {shard file name: validation counters}}; rejected rows are written
+        # to quarantine_dir/<dataset>/<shard file name>
+        self.quality_report = {}
+        self.quarantine_dir = os.path.join(data_dir, ".quarantine")
+        # Processes used to parse CSV shards; 1 keeps everything in-process
+        if workers is None:
+            workers = int(os.getenv("LOADER_WORKERS", "0")) or os.cpu_count() or 1
+        self.workers = workers
+        # Per-dataset memory footprint (bytes) as parsed vs. after the compact schema
+        self.memory_report = {}
+        # "rows" keeps every CSV row; "aggregate" streams shards in chunks and keeps
+        # one row per (date, state, district, pincode) cell plus a 'rows' count
+        self.mode = mode or os.getenv("LOADER_MODE", "rows")
+        self.aggregated = self.mode == "aggregate"
+        self.chunksize = chunksize or int(os.getenv("LOADER_CHUNKSIZE", "200000"))
+        # "mmap" serves the frames from read-only memory maps of the snapshot, so
+        # every gunicorn worker shares one copy of the columns; "memory" keeps
+        # private in-process arrays. The indexes built on top of the frames (cubes,
+        # activity table, time series, anomaly baselines, region tree) are private
+        # either way: shared with --preload until the first reload, after which
+        # every worker builds and holds its own copy
+        self.store = store or os.getenv("DATA_STORE", "mmap")
+        # Per-dataset progress of the current/last load, served by the readiness endpoint
+        self.load_status = {name: {"state": "pending"} for name, _, _ in DATASETS}
+        self.load_error = None
+        self._ready = threading.Event()
+        self._warmup_lock = threading.Lock()
+        self._warmup_thread = None
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def enrolment_df(self):
+        return self.current.frames["enrolment"] if self.current else None
+
+    @property
+    def demographic_df(self):
+        return self.current.frames["demographic"] if self.current else None
+
+    @property
+    def biometric_df(self):
+        return self.current.frames["biometric"] if self.current else None
+
+    @property
+    def version(self):
+        return self.current.version if self.current else 0
+
+    def frame(self, name, date_from=None, date_to=None, state=None, district=None):
+        """
+        Frame of one dataset, optionally restricted to date_from <= date <=
+        date_to (day ordinals, see app.data.dates; both inclusive) and to a
+        state/district, using the date and region indexes.
+        """
+        return self.current.cubes[name].rows(state, district, date_from, date_to)
+
+    def cube(self, name):
+        return self.current.cubes[name]
+
+    def activity(self):
+        return self.current.activity
+
+    def anomalies(self, name):
+        return self.current.anomalies[name]
+
+    def timeseries(self, name):
+        return self.current.timeseries[name]
+
+    def regions(self):
+        return self.current.regions
+
+    def cube_for(self, df, generation=None):
+        """Cube of a frame published in `generation` (the current one by default), or None for any other frame."""
+        current = generation or self.current
+        for name, frame in current.frames.items():
+            if frame is df:
+                return current.cubes[name]
+        return None
+
+    def date_bounds(self, name=None):
+        """(first, last) day ordinal across all datasets (or just `name`), or (None, None)."""
+        names = [name] if name else [n for n, _, _ in DATASETS]
+        bounds = [self.current.dates[n].bounds() for n in names]
+        bounds = [b for b in bounds if b[0] is not None]
+        if not bounds:
+            return None, None
+        return min(b[0] for b in bounds), max(b[1] for b in bounds)
         
+    def load_data(self, use_snapshot=True, workers=None):
+        """
+        Loads data from the three subdirectories. Datasets whose snapshot is
+        current are restored directly; the shards of all remaining datasets are
+        parsed together in one process pool.
+        """
+        with self._reload_lock:
+            try:
+                self._publish(*self._build(None, use_snapshot, workers))
+                self.load_error = None
+            except Exception as e:
+                self.load_error = str(e)
+                for name, status in self.load_status.items():
+                    if status["state"] != "ready":
+                        self.load_status[name] = {"state": "failed", "error": str(e)}
+                raise
+        self._ready.set()
         print("Data Loading Complete.")
 
-    def _load_csvs_from_dir(self, directory):
-        all_files = glob.glob(os.path.join(directory, "*.csv"))
-        df_list = []
-        for filename in all_files:
+    def start_background_load(self):
+        """
+        Starts load_data() in a warm-up thread (once per process) so the server
+        can bind its port immediately. Safe to call on every request.
+        """
+        if self.current is not None:
+            return
+        with self._warmup_lock:
+            if self.current is not None or (self._warmup_thread and self._warmup_thread.is_alive()):
+                return
+            self._warmup_thread = threading.Thread(target=self._warm_up, name="data-warmup", daemon=True)
+            self._warmup_thread.start()
+
+    def _warm_up(self):
+        try:
+            self.load_data()
+        except Exception as e:
+            # Left unready; the next start_background_load() call retries
+            print(f"Background data load failed: {e}")
+
+    def wait_until_ready(self, timeout=None):
+        """True once a generation is published, False if `timeout` ran out first."""
+        return self.current is not None or self._ready.wait(timeout)
+
+    def _after_fork(self):
+        # Threads do not survive fork(); a child forked mid-warm-up starts its own
+        self._reload_lock = threading.Lock()
+        self._warmup_lock = threading.Lock()
+        self._warmup_thread = None
+        if self.current is None:
+            self._ready = threading.Event()
+
+    def reload(self, workers=None, settle=0, parse=True):
+        """
+        Picks up new or changed shards without interrupting readers. Unchanged
+        datasets keep their frame, datasets that only gained shards parse just
+        the new files, anything else is rebuilt. The new frames are published
+        only once all of them are ready.
+
+        Shards modified less than `settle` seconds ago may still be mid-copy;
+        their dataset is left alone until the next call. With `parse=False`
+        changed datasets are only taken from a snapshot another process wrote,
+        and left alone until one exists.
+        Returns {dataset: action} for datasets that changed, {} if none did.
+        """
+        if self.current is None:
+            self.load_data(workers=workers)
+            return {name: "loaded" for name, _, _ in DATASETS}
+
+        with self._reload_lock:
+            frames, shards, actions = self._build(self.current, True, workers, settle, parse)
+            if actions:
+                self._publish(frames, shards, actions)
+            return actions
+
+    def _publish(self, frames, shards, actions):
+        version = self.version + 1
+        previous = self.current
+        # Date indexes and cubes of frames carried over unchanged are reused as they are
+        dates, cubes, anomalies, timeseries = {}, {}, {}, {}
+        for name, df in frames.items():
+            if previous and previous.frames[name] is df:
+                dates[name], cubes[name] = previous.dates[name], previous.cubes[name]
+                timeseries[name] = previous.timeseries[name]
+                if name in ANOMALY_DATASETS:
+                    anomalies[name] = previous.anomalies[name]
+            else:
+                dates[name] = DateIndex(df[schema.DATE_COLUMN])
+                cubes[name] = Cube(df, dates[name], RegionIndex(df))
+                if name in ANOMALY_DATASETS:
+                    # Appended days are scored on top of the previous baselines
+                    anomalies[name] = AnomalyIndex(df, cubes[name].regions.sorted,
+                                                   previous=previous.anomalies.get(name) if previous else None)
+                    cells = anomalies[name].cells
+                else:
+                    cells = daily_cells(df, cubes[name].regions.sorted)
+                timeseries[name] = TimeSeriesIndex(cells)
+        if previous and all(previous.cubes[name] is cube for name, cube in cubes.items()):
+            activity, regions = previous.activity, previous.regions
+        else:
+            activity = ActivityTable(cubes)
+            regions = RegionTree(activity)
+        stats = sorted((os.path.basename(path), stat) for manifest in shards.values() for path, stat in manifest.items())
+        tag = hashlib.sha1(f"{self.mode}:{self.normalizer.fingerprint()}:{stats}".encode()).hexdigest()
+        loaded_at = time.time()
+        modified = previous.modified if previous and previous.tag == tag else loaded_at
+        self.current = Generation(version, frames, shards, loaded_at, dates, cubes, activity, anomalies,
+                                  timeseries, regions, tag, modified)
+        if self.current.version > 1:
+            print(f"Data version {version} published: {actions}")
+
+    def _stat_shards(self, files):
+        manifest = {}
+        for path in files:
+            st = os.stat(path)
+            manifest[path] = (st.st_size, st.st_mtime_ns)
+        return manifest
+
+    def _build(self, previous, use_snapshot=True, workers=None, settle=0, parse=True):
+        """
+        Builds the frames of a new generation next to `previous` (which is left
+        untouched). Returns (frames, shards, {dataset: action}).
+        """
+        frames, shards, actions, plan = {}, {}, {}, {}
+        now = time.time()
+        for name, subdir, label in DATASETS:
+            files = self._list_shards(os.path.join(self.data_dir, subdir))
+            manifest = self._stat_shards(files)
+            old = previous.shards[name] if previous else None
+
+            if old == manifest or (old is not None and any(
+                    now - mtime / 1e9 < settle for _, mtime in manifest.values())):
+                frames[name], shards[name] = previous.frames[name], old
+                continue
+
+            if previous is None:
+                print(f"Loading {label} Data...")
+            status = self.load_status[name]
+            self.load_status[name] = {"state": "loading", "started_at": time.time()}
+            shards[name] = manifest
+            fingerprint = fingerprint_files(files, f"{self.mode}:{self.normalizer.fingerprint()}") if use_snapshot else None
+
+            if use_snapshot:
+                start = time.time()
+                df = self.snapshot.load(name, fingerprint, mmap=self.store == "mmap")
+                if df is not None:
+                    print(f"  {name}: {len(df):,} rows from snapshot in {time.time() - start:.2f}s")
+                    self._mark_ready(name, df, "snapshot")
+                    self.memory_report[name] = {"after_bytes": schema.memory_footprint(df)}
+                    extra = self.snapshot.load_extra(name, fingerprint)
+                    self.normalization_report[name] = extra.get("collapsed", {})
+                    self.quality_report[name] = extra.get("quality", {})
+                    frames[name], actions[name] = df, "snapshot"
+                    continue
+
+            if not parse and previous is not None:
+                # Another process parses these shards; its snapshot is picked up on a later pass
+                frames[name], shards[name] = previous.frames[name], old
+                self.load_status[name] = status
+                continue
+
+            if old is not None and all(old.get(path) == stat for path, stat in manifest.items() if path in old) \
+                    and set(old) <= set(manifest):
+                # Shards were only added: parse just those and append to the live rows
+                plan[name] = ([f for f in files if f not in old], fingerprint, previous.frames[name])
+            else:
+                plan[name] = (files, fingerprint, None)
+
+        if plan:
+            start = time.time()
+            all_files = [f for files, _, _ in plan.values() for f in files]
+            parsed, quality = self._read_shards(all_files, workers)
+
+            for name, (files, fingerprint, base) in plan.items():
+                old_report = self.normalization_report.get(name, {})
+                self._quarantine(name, {f: quality[f] for f in files if f in quality}, reset=base is None)
+                df, before = self._normalize_shards(name, [parsed[f] for f in files if f in parsed])
+                if base is not None:
+                    if len(base):
+                        df = self._fold(self._concat_shards([base, df]))
+                    # The new shards were counted on their own; keep the larger count per
+                    # name, a lower bound until the next full rebuild
+                    for col, counts in old_report.items():
+                        merged = self.normalization_report.setdefault(name, {}).setdefault(col, {})
+                        for canon, n in counts.items():
+                            merged[canon] = max(n, merged.get(canon, 0))
+                    actions[name] = "appended"
+                else:
+                    actions[name] = "rebuilt" if previous else "parsed"
+                # Contiguous state/district blocks back the RegionIndex
+                df = sort_by_region(df)
+
+                after = schema.memory_footprint(df)
+                self.memory_report[name] = {"before_bytes": before, "after_bytes": after}
+                print(f"  {name}: {len(df):,} rows ({actions[name]}, {len(files)} CSV shard(s) read), "
+                      f"memory {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+                extra = {"collapsed": self.normalization_report.get(name, {}), "quality": self.quality_report[name]}
+                if use_snapshot and self.snapshot.save(name, fingerprint, df, extra=extra) and self.store == "mmap":
+                    # Swap the freshly parsed arrays for the mapped copy just written
+                    mapped = self.snapshot.load(name, fingerprint, mmap=True)
+                    if mapped is not None:
+                        df = mapped
+                frames[name] = df
+                self._mark_ready(name, df, actions[name])
+            print(f"  parsed {len(all_files)} shard(s) in {time.time() - start:.2f}s")
+
+        # Always in DATASETS order, whichever datasets were carried over: the order
+        # flows into cubes, ActivityTable columns and the RegionTree document
+        frames = {name: frames[name] for name, _, _ in DATASETS}
+        shards = {name: shards[name] for name, _, _ in DATASETS}
+        return frames, shards, actions
+
+    def _mark_ready(self, name, df, source):
+        started = self.load_status[name].get("started_at", time.time())
+        self.load_status[name] = {
+            "state": "ready",
+            "source": source,
+            "rows": len(df),
+            "seconds": round(time.time() - started, 3),
+        }
+
+    def _quarantine(self, name, quality, reset):
+        """
+        Records the validation counters of freshly read shards and writes their
+        rejected rows next to the dataset. `reset` drops what earlier builds
+        recorded (full rebuild); otherwise the new shards are added to it.
+        """
+        report = {} if reset else dict(self.quality_report.get(name, {}))
+        directory = os.path.join(self.quarantine_dir, name)
+        if reset:
+            shutil.rmtree(directory, ignore_errors=True)
+        for filename, (rejected, counters) in quality.items():
+            shard = os.path.basename(filename)
+            report[shard] = counters
+            path = os.path.join(directory, shard)
             try:
-                df = pd.read_csv(filename, index_col=None, header=0)
-                df_list.append(df)
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
-        
+                if rejected is not None:
+                    os.makedirs(directory, exist_ok=True)
+                    rejected.to_csv(path, index=False)
+                elif os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                print(f"Could not write quarantine file {path}: {e}")
+            if counters["rejected"]:
+                print(f"  {name}/{shard}: quarantined {counters['rejected']:,} of {counters['rows']:,} rows {counters['rules']}")
+        self.quality_report[name] = report
+
+    def _normalize_shards(self, name, df_list):
+        """Concatenates parsed shards and normalizes them. Returns (frame, bytes as parsed)."""
+        raw = self._concat_shards(df_list)
+        if raw.columns.empty:
+            return schema.empty_frame(name, self.aggregated), 0
+        before = schema.memory_footprint(raw)
+        normalize = getattr(self, f"_normalize_{name}")
+        return self._fold(schema.apply_schema(normalize(raw))), before
+
+    def _fold(self, df):
+        # Shard partials (or a live frame plus new shards) can repeat a cell once names are normalized
+        if not self.aggregated:
+            return df
+        return schema.apply_schema(schema.fold(df))
+
+    def _list_shards(self, directory):
+        return sorted(glob.glob(os.path.join(directory, "*.csv")))
+
+    def _read_shards(self, files, workers=None):
+        """
+        Parses shards (or, in aggregate mode, streams them into per-cell
+        aggregates), across a process pool when there is more than one shard
+        and more than one worker. Returns ({filename: clean DataFrame},
+        {filename: (quarantined rows or None, validation counters)}) for every
+        shard that parsed; failures are reported and skipped.
+        """
+        read = partial(_aggregate_shard, chunksize=self.chunksize) if self.aggregated else _read_shard
+        workers = min(workers or self.workers, len(files))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) as pool:
+                results = list(pool.map(read, files))
+        else:
+            results = [read(f) for f in files]
+
+        frames, quality = {}, {}
+        for filename, (df, rejected, counters, error) in zip(files, results):
+            if error is not None:
+                print(f"Error reading {filename}: {error}")
+            else:
+                frames[filename] = df
+                quality[filename] = (rejected, counters)
+        return frames, quality
+
+    def _concat_shards(self, df_list):
         if not df_list:
             return pd.DataFrame()
         
-        return pd.concat(df_list, axis=0, ignore_index=True)
+        return pd.concat(schema.unify_categories(df_list), axis=0, ignore_index=True)
+
+    def _load_csvs_from_dir(self, directory, all_files=None, workers=None):
+        if all_files is None:
+            all_files = self._list_shards(directory)
+        frames, _ = self._read_shards(all_files, workers)
+        return self._concat_shards([frames[f] for f in all_files if f in frames])
 
-    def _normalize_enrolment(self):
+    def _normalize_enrolment(self, df):
         # Expected: date,state,district,pincode,age_0_5,age_5_17,age_18_above
         # Check actual columns from provided sample: "date,state,district,pincode,age_0_5,age_5_17,age_18_greater"
         rename_map = {
             "age_18_greater": "age_18_above",
             "age_18_plus": "age_18_above"
         }
-        self.enrolment_df.rename(columns=rename_map, inplace=True)
-        self._clean_common_columns(self.enrolment_df)
+        df.rename(columns=rename_map, inplace=True)
+        self._clean_common_columns(df, 'enrolment')
+        return df
 
-    def _normalize_demographic(self):
+    def _normalize_demographic(self, df):
         # Expected: date,state,district,pincode,age_5_17,age_18_above
         # Sample headers: date,state,district,pincode,demo_age_5_17,demo_age_17_
         rename_map = {
@@ -59,57 +515,31 @@ class DataLoader:
             "demo_age_17_": "age_18_above", # Assuming demo_age_17_ means 18 and above or >17
             "demo_age_18_above": "age_18_above"
         }
-        self.demographic_df.rename(columns=rename_map, inplace=True)
-        self._clean_common_columns(self.demographic_df)
+        df.rename(columns=rename_map, inplace=True)
+        self._clean_common_columns(df, 'demographic')
+        return df
 
-    def _normalize_biometric(self):
+    def _normalize_biometric(self, df):
         # Sample headers: date,state,district,pincode,bio_age_5_17,bio_age_17_
         rename_map = {
             "bio_age_5_17": "age_5_17",
             "bio_age_17_": "age_18_above",
             "bio_age_18_above": "age_18_above"
         }
-        self.biometric_df.rename(columns=rename_map, inplace=True)
-        self._clean_common_columns(self.biometric_df)
-
-    def _clean_common_columns(self, df):
-        # Standardize State/District names (Title Case, strip whitespace)
-        if 'state' in df.columns:
-            # canonical mapping (stripped of spaces and lowercase)
-            canonical_map = {
-                "westbengal": "West Bengal",
-                "uttarpradesh": "Uttar Pradesh",
-                "andhrapradesh": "Andhra Pradesh",
-                "tamilnadu": "Tamil Nadu",
-                "telangana": "Telangana",
-                "telengana": "Telangana",
-                "chhattisgarh": "Chhattisgarh",
-                "chattisgarh": "Chhattisgarh",
-                "madhyapradesh": "Madhya Pradesh",
-                "arunachalpradesh": "Arunachal Pradesh",
-                "himachalpradesh": "Himachal Pradesh",
-                "jk": "Jammu And Kashmir",
-                "jammuandkashmir": "Jammu And Kashmir",
-                "dadraandnagarhavelianddamananddiu": "Dadra And Nagar Haveli And Daman And Diu",
-                "dnhanddd": "Dadra And Nagar Haveli And Daman And Diu"
-            }
-            
-            def standardize(val):
-                val = str(val).strip().lower()
-                # Remove spaces, dots, dashes for comparison
-                clean = "".join(c for c in val if c.isalnum())
-                return canonical_map.get(clean, val.title())
-
-            df['state'] = df['state'].apply(standardize)
-
-        if 'district' in df.columns:
-            df['district'] = df['district'].astype(str).str.strip().str.title()
-        
-        # Ensure numeric columns are numeric
-        numeric_cols = ['age_0_5', 'age_5_17', 'age_18_above']
-        for col in numeric_cols:
+        df.rename(columns=rename_map, inplace=True)
+        self._clean_common_columns(df, 'biometric')
+        return df
+
+    def _clean_common_columns(self, df, name=None):
+        # Standardize State/District names once per distinct spelling (alias table, else Title Case)
+        collapsed = {}
+        for col in ('state', 'district'):
             if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+                df[col], collapsed[col] = self.normalizer.normalize(df[col], col)
+        if name:
+            self.normalization_report[name] = collapsed
+        
+        # Numeric coercion and compact dtypes are handled by schema.apply_schema
 
 
 # Fix path to be relative to this file
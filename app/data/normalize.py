@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Alias tables are keyed on the "compact" spelling: lowercase, alphanumerics only.
+STATE_ALIASES = {
+    "westbengal": "West Bengal",
+    "uttarpradesh": "Uttar Pradesh",
+    "andhrapradesh": "Andhra Pradesh",
+    "tamilnadu": "Tamil Nadu",
+    "telangana": "Telangana",
+    "telengana": "Telangana",
+    "chhattisgarh": "Chhattisgarh",
+    "chattisgarh": "Chhattisgarh",
+    "madhyapradesh": "Madhya Pradesh",
+    "arunachalpradesh": "Arunachal Pradesh",
+    "himachalpradesh": "Himachal Pradesh",
+    "jk": "Jammu And Kashmir",
+    "jammuandkashmir": "Jammu And Kashmir",
+    "dadraandnagarhavelianddamananddiu": "Dadra And Nagar Haveli And Daman And Diu",
+    "dnhanddd": "Dadra And Nagar Haveli And Daman And Diu",
+    "orissa": "Odisha",
+    "pondicherry": "Puducherry",
+}
+
+# Only unambiguous renames belong here: a district name that exists in more
+# than one state (e.g. Bijapur) must not be aliased globally.
+DISTRICT_ALIASES = {
+    "bangalore": "Bengaluru",
+    "ahmadabad": "Ahmedabad",
+    "belgaum": "Belagavi",
+    "bellary": "Ballari",
+}
+
+
+def compact_key(value):
+    return "".join(c for c in str(value).strip().lower() if c.isalnum())
+
+
+class RegionNormalizer:
+    """
+    Canonicalizes state/district names once per distinct spelling and
+    broadcasts the result back to every row through categorical codes.
+
+    Alias tables are pluggable: pass dicts to the constructor, or drop a
+    region_aliases.json ({"state": {...}, "district": {...}}) next to the
+    dataset and load it with from_file().
+    """
+
+    def __init__(self, state_aliases=None, district_aliases=None):
+        self.aliases = {
+            "state": dict(STATE_ALIASES, **(state_aliases or {})),
+            "district": dict(DISTRICT_ALIASES, **(district_aliases or {})),
+        }
+
+    @classmethod
+    def from_file(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            extra = json.load(f)
+        return cls(
+            state_aliases={compact_key(k): v for k, v in extra.get("state", {}).items()},
+            district_aliases={compact_key(k): v for k, v in extra.get("district", {}).items()},
+        )
+
+    def fingerprint(self):
+        """Changes whenever the alias tables change, so cached frames get rebuilt."""
+        return hashlib.sha1(json.dumps(self.aliases, sort_keys=True).encode()).hexdigest()
+
+    def canonical(self, column, raw):
+        value = str(raw).strip()
+        return self.aliases[column].get(compact_key(value), value.title())
+
+    def normalize(self, series, column):
+        """
+        Returns (categorical Series of canonical names, {canonical: number of
+        raw spellings}) for one region column.
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            raw_values = list(series.cat.categories)
+        else:
+            codes, uniques = pd.factorize(series)
+            raw_values = list(uniques)
+
+        # Missing values have always been normalized as the string "nan"
+        if (codes < 0).any():
+            codes = np.where(codes < 0, len(raw_values), codes)
+            raw_values.append("nan")
+
+        canonical = [self.canonical(column, v) for v in raw_values]
+        remap, categories = pd.factorize(pd.Index(canonical), sort=True)
+        new_codes = remap[codes] if len(codes) else codes.astype(remap.dtype)
+        result = pd.Series(
+            pd.Categorical.from_codes(new_codes, categories=categories),
+            index=series.index, name=series.name,
+        )
+
+        # Only spellings that occur in the data count towards a collapse
+        used = np.zeros(len(raw_values), dtype=bool)
+        used[np.unique(codes)] = True
+        spellings = pd.Series(np.asarray(canonical, dtype=object)[used]).value_counts()
+        return result, {name: int(n) for name, n in spellings.items() if n > 1}
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["area", "district", "state", "lat", "lng"]
+
+# Header spellings accepted in the directory file; the second set matches the
+# All India Pincode Directory published on data.gov.in, so it can be dropped in as is
+COLUMN_ALIASES = {
+    "officename": "area",
+    "districtname": "district",
+    "statename": "state",
+    "latitude": "lat",
+    "longitude": "lng",
+}
+
+
+class PincodeDirectory:
+    """
+    Pincode dimension table: area name, district, state and coordinates per
+    pincode. Loaded once from pincode_directory.csv next to the datasets;
+    labels for a whole vector of pincodes are one index join.
+    """
+
+    def __init__(self, table=None):
+        if table is None:
+            table = pd.DataFrame(columns=COLUMNS, index=pd.Index([], dtype="int64", name="pincode"))
+        self.table = table
+        self.index = table.index
+        self.areas = table["area"].to_numpy(dtype=object)
+        self.coords = table[["lat", "lng"]].to_numpy(dtype="float64")
+        # Centroids of the directory's known coordinates, for geocoding by name
+        located = table.dropna(subset=["lat", "lng"])
+        self.centroids = {}
+        for col in ("district", "state"):
+            for name, (lat, lng) in located.groupby(col)[["lat", "lng"]].mean().iterrows():
+                self.centroids.setdefault(name, [float(lat), float(lng)])
+
+    @classmethod
+    def from_file(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        raw = pd.read_csv(path, dtype=str)
+        raw = raw.rename(columns=lambda col: COLUMN_ALIASES.get(col.strip().lower(), col.strip().lower()))
+        raw["pincode"] = pd.to_numeric(raw["pincode"], errors="coerce")
+        raw = raw.dropna(subset=["pincode"])
+        for col in COLUMNS:
+            if col not in raw.columns:
+                raw[col] = None
+        for col in ("lat", "lng"):
+            raw[col] = pd.to_numeric(raw[col], errors="coerce")
+        for col in ("area", "district", "state"):
+            raw[col] = raw[col].str.strip()
+        # Several post offices share a pincode: the first one names it
+        table = raw.astype({"pincode": "int64"}).drop_duplicates("pincode").set_index("pincode")[COLUMNS]
+        print(f"Pincode directory: {len(table):,} pincodes from {os.path.basename(path)}")
+        return cls(table)
+
+    def _positions(self, pincodes):
+        # Plain object strings, whichever string dtype pandas defaults to
+        text = pd.Series(list(pincodes), dtype=object).astype(str).str.strip().astype(object)
+        codes = pd.to_numeric(text, errors="coerce").fillna(-1).astype("int64")
+        return text, self.index.get_indexer(codes)
+
+    def labels(self, pincodes):
+        """'Area (pincode)' for pincodes in the directory, the pincode itself otherwise."""
+        text, pos = self._positions(pincodes)
+        areas = pd.Series(self.areas, dtype=object).reindex(pos).reset_index(drop=True)
+        named = areas.notna() & (areas != "")
+        return text.where(~named, areas + " (" + text + ")").tolist()
+
+    def coordinates(self, pincodes):
+        """(n, 2) array of lat/lng per pincode; NaN where unknown."""
+        _, pos = self._positions(pincodes)
+        if not len(self.coords):
+            return np.full((len(pos), 2), np.nan)
+        out = self.coords[np.where(pos >= 0, pos, 0)]
+        out[pos < 0] = np.nan
+        return out
+
+    def locate(self, query):
+        """[lat, lng] of a pincode, district or state name, or None."""
+        query = str(query).strip()
+        if query.isdigit():
+            lat, lng = self.coordinates([query])[0]
+            return None if np.isnan(lat) else [float(lat), float(lng)]
+        return self.centroids.get(query)
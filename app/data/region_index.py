@@ -0,0 +1,112 @@
+import numpy as np
+
+
+def sort_by_region(df):
+    """
+    Orders rows by (state, district, pincode, date) so that every state and
+    every (state, district) pair occupies one contiguous block of rows.
+    Sorts on the categorical codes, i.e. the order RegionIndex relies on.
+    """
+    if len(df) < 2:
+        return df
+    keys = [df[col].to_numpy().view("int64") if col == "date" else df[col].to_numpy()
+            for col in ("date", "pincode") if col in df.columns]
+    keys += [df["district"].cat.codes.to_numpy(), df["state"].cat.codes.to_numpy()]
+    order = np.lexsort(keys)
+    if np.array_equal(order, np.arange(len(df))):
+        return df
+    return df.take(order).reset_index(drop=True)
+
+
+class RegionIndex:
+    """
+    Start/end row offsets of every state and (state, district) block of a
+    frame sorted with sort_by_region(), so a region filter is a dict lookup
+    and a zero-copy slice instead of a boolean mask over every row.
+
+    Frames that are not sorted that way (e.g. restored from an older
+    snapshot) still work: rows() then falls back to scanning.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.states, self.blocks, self.districts = {}, {}, {}
+        if not len(df):
+            self.sorted = True
+            return
+
+        s_codes = df["state"].cat.codes.to_numpy()
+        d_codes = df["district"].cat.codes.to_numpy()
+        change = np.flatnonzero((s_codes[1:] != s_codes[:-1]) | (d_codes[1:] != d_codes[:-1])) + 1
+        starts = np.concatenate(([0], change))
+        ends = np.concatenate((change, [len(df)]))
+
+        # Sorted means every (state, district) block appears once, in code order
+        s, d = s_codes[starts], d_codes[starts]
+        self.sorted = bool(np.all((s[1:] > s[:-1]) | ((s[1:] == s[:-1]) & (d[1:] > d[:-1]))))
+        if not self.sorted:
+            return
+
+        state_names = df["state"].cat.categories
+        district_names = df["district"].cat.categories
+        for sc, dc, start, end in zip(s.tolist(), d.tolist(), starts.tolist(), ends.tolist()):
+            if sc < 0 or dc < 0:
+                continue
+            state, district = state_names[sc], district_names[dc]
+            self.blocks[(state, district)] = (start, end)
+            first, _ = self.states.get(state, (start, end))
+            self.states[state] = (first, end)
+            self.districts.setdefault(district, []).append((start, end))
+
+    def rows(self, state=None, district=None):
+        """
+        Positions of the rows in a region: None (no filter), a slice, or a
+        sorted int array when a district name spans several states.
+        """
+        if not state and not district:
+            return None
+        if not self.sorted:
+            mask = np.ones(len(self.df), dtype=bool)
+            if state:
+                mask &= (self.df["state"] == state).to_numpy()
+            if district:
+                mask &= (self.df["district"] == district).to_numpy()
+            return np.flatnonzero(mask)
+
+        if state and district:
+            ranges = [self.blocks[(state, district)]] if (state, district) in self.blocks else []
+        elif state:
+            ranges = [self.states[state]] if state in self.states else []
+        else:
+            ranges = self.districts.get(district, [])
+
+        if not ranges:
+            return slice(0, 0)
+        if len(ranges) == 1:
+            return slice(*ranges[0])
+        return np.concatenate([np.arange(start, end) for start, end in ranges])
+
+
+def intersect(a, b):
+    """Intersection of two row selections as returned by rows() (None = everything)."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if isinstance(a, slice) and isinstance(b, slice):
+        start = max(a.start, b.start)
+        return slice(start, max(start, min(a.stop, b.stop)))
+    if isinstance(a, slice):
+        a, b = b, a
+    if isinstance(b, slice):
+        return a[np.searchsorted(a, b.start):np.searchsorted(a, b.stop)]
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+def take(df, rows):
+    """Applies a row selection; slices stay views of `df`."""
+    if rows is None:
+        return df
+    if isinstance(rows, slice):
+        return df.iloc[rows]
+    return df.take(rows)
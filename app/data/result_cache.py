@@ -0,0 +1,109 @@
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of analyzer results, keyed by (method, normalized
+    arguments, data version). Entries of an older data version are dropped
+    as soon as a newer version is seen, so a result computed before a reload
+    is never served after it.
+
+    Every hit hands out the cached object itself, shared by all requests:
+    callers must treat results as read-only and copy what they change.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key, version, compute):
+        if self.maxsize <= 0:
+            return compute()
+        key = (version,) + key
+        with self._lock:
+            stale = self.version is not None and version < self.version
+        if stale:
+            # A call still reading an older generation: never cached, never evicts the newer entries
+            return compute()
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                result = self._entries[key]
+                hit = True
+            else:
+                self.misses += 1
+                hit = False
+
+        if not hit:
+            result = compute()
+            with self._lock:
+                if version == self.version:
+                    self._entries[key] = result
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def _normalize(name, value):
+    # "All" and empty filters mean "no filter", so they share one entry with None
+    if name.endswith("_filter") and (value in ("", "All") or value is None):
+        return None
+    return value
+
+
+def cached(method):
+    """
+    Serves an Analyzer method from self.cache. Positional and keyword
+    spellings of the same call map to one key, and "All"/empty filters are
+    passed to the method as None. The call runs inside self.pinned(), so it
+    reads one generation and is cached under its version.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        # The method sees the same normalized filters as the key, so "All" and None
+        # cannot produce different results under one entry
+        for name, value in bound.arguments.items():
+            bound.arguments[name] = _normalize(name, value)
+        key = (method.__name__,) + tuple((name, value) for name, value in bound.arguments.items() if name != "self")
+        # The key carries the version of the generation the call actually reads
+        with self.pinned() as generation:
+            version = generation.version if generation is not None else 0
+            return self.cache.get_or_compute(key, version, lambda: method(*bound.args, **bound.kwargs))
+
+    return wrapper
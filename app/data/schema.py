@@ -0,0 +1,102 @@
+import pandas as pd
+
+# Dtypes handed to read_csv. Region names repeat on every row, so they are
+# dictionary-encoded as soon as a shard is parsed.
+READ_DTYPES = {
+    "state": "category",
+    "district": "category",
+}
+
+# Final dtypes of the normalized frames (after column renames).
+# Counters are uint32 rather than uint16 so per-row totals of the age buckets
+# (age_0_5 + age_5_17 + age_18_above) can never wrap around.
+COLUMN_DTYPES = {
+    "state": "category",
+    "district": "category",
+    "pincode": "int32",
+    "age_0_5": "uint32",
+    "age_5_17": "uint32",
+    "age_18_above": "uint32",
+    "rows": "uint32",
+}
+
+DATE_COLUMN = "date"
+DATE_FORMAT = "%d-%m-%Y"
+
+COUNT_COLUMNS = ["age_0_5", "age_5_17", "age_18_above"]
+
+# Aggregated frames hold one row per (date, state, district, pincode) cell, with
+# the counters summed and the number of source rows in ROWS_COLUMN.
+GROUP_KEYS = ["date", "state", "district", "pincode"]
+ROWS_COLUMN = "rows"
+
+# Sum of the age buckets of a cube cell, precomputed so requests never add it up
+TOTAL_COLUMN = "total"
+
+# Normalized columns of each dataset
+DATASET_COLUMNS = {
+    "enrolment": ["date", "state", "district", "pincode", "age_0_5", "age_5_17", "age_18_above"],
+    "demographic": ["date", "state", "district", "pincode", "age_5_17", "age_18_above"],
+    "biometric": ["date", "state", "district", "pincode", "age_5_17", "age_18_above"],
+}
+
+
+def apply_schema(df):
+    """Casts a normalized frame to the compact dtypes declared above, in place."""
+    if DATE_COLUMN in df.columns and not pd.api.types.is_datetime64_any_dtype(df[DATE_COLUMN]):
+        df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], format=DATE_FORMAT, errors="coerce")
+
+    for col, dtype in COLUMN_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if dtype == "category":
+            df[col] = df[col].astype("category")
+        else:
+            values = pd.to_numeric(df[col], errors="coerce").fillna(0)
+            if col in COUNT_COLUMNS:
+                # Negative counts would wrap around in an unsigned column
+                values = values.clip(lower=0)
+            df[col] = values.astype(dtype)
+    return df
+
+
+def empty_frame(name, aggregated=False):
+    """Zero-row frame with the declared dtypes, used when a dataset has no shards."""
+    dtypes = dict(COLUMN_DTYPES, **{DATE_COLUMN: "datetime64[ns]"})
+    columns = DATASET_COLUMNS[name] + ([ROWS_COLUMN] if aggregated else [])
+    return pd.DataFrame({col: pd.Series(dtype=dtypes[col]) for col in columns})
+
+
+def fold(df):
+    """
+    Collapses rows sharing a (date, state, district, pincode) cell into one,
+    summing every other column. Plain rows count as 1 towards ROWS_COLUMN.
+    Rows with missing keys are kept so totals never change.
+    """
+    keys = [k for k in GROUP_KEYS if k in df.columns]
+    if ROWS_COLUMN not in df.columns:
+        df = df.assign(**{ROWS_COLUMN: 1})
+    return df.groupby(keys, observed=True, dropna=False, sort=False, as_index=False).sum()
+
+
+def unify_categories(df_list):
+    """
+    Gives every categorical column the same categories across shards, so that
+    pd.concat keeps them categorical instead of falling back to object.
+    Works on shallow copies, so frames that are already live are not touched.
+    """
+    df_list = [df.copy(deep=False) for df in df_list]
+    for col in READ_DTYPES:
+        parts = [df[col] for df in df_list if col in df.columns]
+        if not parts or not all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            continue
+        categories = pd.Index(sorted(set().union(*(p.cat.categories for p in parts))))
+        for df in df_list:
+            if col in df.columns:
+                df[col] = df[col].cat.set_categories(categories)
+    return df_list
+
+
+def memory_footprint(df):
+    """Bytes held by a frame, including the Python strings behind object columns."""
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Bump whenever normalization changes the shape/content of the cached frames,
+# so stale snapshots from an older build are never picked up.
+SNAPSHOT_VERSION = 4
+
+
+def fingerprint_files(files, salt=""):
+    """
+    Hash of (path, size, mtime) for every shard feeding one dataset. `salt`
+    covers anything else the cached frame depends on (e.g. alias tables).
+    """
+    h = hashlib.sha1(f"v{SNAPSHOT_VERSION}:{salt}".encode())
+    for path in sorted(files):
+        st = os.stat(path)
+        h.update(f"|{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+class SnapshotCache:
+    """
+    Columnar on-disk cache of the normalized DataFrames.
+
+    Every dataset is stored as one directory of plain .npy column files plus a
+    meta.json describing how to rebuild the frame. String columns are stored
+    dictionary-encoded (int codes + unique values), so no pickling is involved
+    and numeric columns can be loaded straight from disk.
+
+    load(mmap=True) maps the column files read-only instead of reading them:
+    numeric columns and the codes of category columns then live in the OS
+    page cache, which every process mapping the same snapshot shares. Plain
+    string columns are decoded into private memory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, name, fingerprint):
+        return os.path.join(self.root, f"{name}-{fingerprint[:16]}")
+
+    def load(self, name, fingerprint, mmap=False):
+        path = self._path(name, fingerprint)
+        meta_file = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_file):
+            return None
+        try:
+            with open(meta_file) as f:
+                meta = json.load(f)
+            if meta.get("fingerprint") != fingerprint:
+                return None
+
+            data = {}
+            for col in meta["columns"]:
+                data[col["name"]] = self._read_column(path, col, mmap)
+            # copy=False keeps every column pointing at its (possibly mapped) array
+            return pd.DataFrame(data, columns=[c["name"] for c in meta["columns"]], copy=False)
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot {path}: {e}")
+            return None
+
+    def load_extra(self, name, fingerprint):
+        """Free-form metadata stored alongside a snapshot by save(extra=...)."""
+        try:
+            with open(os.path.join(self._path(name, fingerprint), "meta.json")) as f:
+                return json.load(f).get("extra") or {}
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, name, fingerprint, df, extra=None):
+        columns = []
+        arrays = {}
+        for i, col in enumerate(df.columns):
+            encoded = self._encode_column(df[col])
+            if encoded is None:
+                print(f"Snapshot skipped for {name}: column '{col}' cannot be stored columnar.")
+                return False
+            kind, files = encoded
+            columns.append({"name": col, "kind": kind, "file": f"c{i}"})
+            for suffix, arr in files.items():
+                arrays[f"c{i}{suffix}"] = arr
+
+        final_path = self._path(name, fingerprint)
+        tmp_path = f"{final_path}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            for fname, arr in arrays.items():
+                np.save(os.path.join(tmp_path, fname + ".npy"), arr, allow_pickle=False)
+            with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+                json.dump({"fingerprint": fingerprint, "rows": len(df), "columns": columns, "extra": extra}, f)
+
+            if os.path.exists(final_path):
+                shutil.rmtree(final_path, ignore_errors=True)
+            os.rename(tmp_path, final_path)
+        except OSError as e:
+            print(f"Could not write snapshot for {name}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+
+        self._prune(name, keep=final_path)
+        return True
+
+    def _prune(self, name, keep):
+        # Older fingerprints of the same dataset are dead weight once a new one is written
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if entry.startswith(f"{name}-") and path != keep and ".tmp-" not in entry:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _encode_column(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            uniques = series.cat.categories
+            if not all(isinstance(u, str) for u in uniques):
+                return None
+            return "category", {
+                "": series.cat.codes.to_numpy(),
+                "_values": np.asarray(uniques, dtype=str),
+            }
+
+        if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            codes, uniques = pd.factorize(series)
+            if not all(isinstance(u, str) for u in uniques):
+                return None
+            return str(series.dtype), {
+                "": codes.astype(np.int32),
+                "_values": np.asarray(uniques, dtype=str),
+            }
+
+        values = series.to_numpy()
+        if values.dtype.kind not in "biufM":
+            return None
+        return "array", {"": values}
+
+    def _read_column(self, path, col, mmap=False):
+        base = os.path.join(path, col["file"])
+        values = np.load(base + ".npy", mmap_mode="r" if mmap else None, allow_pickle=False)
+        if col["kind"] == "array":
+            return values
+
+        uniques = np.load(base + "_values.npy", allow_pickle=False).astype(object)
+        dtype = pd.CategoricalDtype(uniques)
+        # Category codes were saved in the dtype pandas keeps them in, so the
+        # Categorical wraps the mapped array as is; validate=False skips a scan
+        # of every code, which were valid when the snapshot was written
+        cat = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        if col["kind"] == "category":
+            return cat
+        # Plain string column: "object", or pandas' dedicated string dtype
+        return pd.Series(np.asarray(cat, dtype=object)).astype(col["kind"])
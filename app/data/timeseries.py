@@ -0,0 +1,134 @@
+import numpy as np
+
+from app.data.dates import day_to_iso
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+
+
+def _prefix_sums(matrix):
+    """Cumulative sums along the day axis with a leading zero column, so the
+    total of days [a, b] of row r is out[r, b + 1] - out[r, a]."""
+    total = int(matrix.sum()) if matrix.size else 0
+    dtype = np.int32 if total < 2 ** 31 else np.int64
+    out = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=dtype)
+    np.cumsum(matrix, axis=1, out=out[:, 1:])
+    return out
+
+
+class TimeSeriesIndex:
+    """
+    Dense daily totals of one dataset for every state, (state, district) and
+    (state, district, pincode), stored as prefix sums over the days between
+    the first and last date with data. Any window total is two lookups per
+    region; resampled series are a handful of vectorized lookups.
+
+    Built from the daily cells of app.data.anomaly.daily_cells(), which come
+    ordered by state, district and pincode.
+    """
+
+    def __init__(self, cells):
+        self.first_day = int(cells["day"].min()) if len(cells) else None
+        self.last_day = int(cells["day"].max()) if len(cells) else None
+        n_days = self.last_day - self.first_day + 1 if len(cells) else 0
+
+        series, rows = np.unique(cells["series"].to_numpy(), return_inverse=True)
+        daily = np.zeros((len(series), n_days), dtype=np.int64)
+        daily[rows, cells["day"].to_numpy() - (self.first_day or 0)] = cells["count"].to_numpy()
+
+        # First cell of every pincode series carries its keys
+        heads = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else rows
+        states = cells["state"].to_numpy()[heads]
+        districts = cells["district"].to_numpy()[heads]
+        pincodes = cells["pincode"].to_numpy()[heads]
+
+        self.pincodes, self.districts, self.states = {}, {}, {}
+        self.district_names = {}
+        district_rows, state_rows = [], []
+        for row, (state, district, pincode) in enumerate(zip(states, districts, pincodes)):
+            self.pincodes.setdefault(int(pincode), []).append((state, district, row))
+            if (state, district) not in self.districts:
+                self.districts[(state, district)] = len(district_rows)
+                self.district_names.setdefault(district, []).append(len(district_rows))
+                district_rows.append(row)
+            if state not in self.states:
+                self.states[state] = len(state_rows)
+                state_rows.append(row)
+
+        # Series are ordered by state and district, so each coarser level is a
+        # run of rows of the finer one
+        by_district = np.add.reduceat(daily, district_rows, axis=0) if district_rows else daily[:0]
+        by_state = np.add.reduceat(daily, state_rows, axis=0) if state_rows else daily[:0]
+        self.levels = {
+            "pincode": _prefix_sums(daily),
+            "district": _prefix_sums(by_district),
+            "state": _prefix_sums(by_state),
+            "all": _prefix_sums(by_state.sum(axis=0, keepdims=True)),
+        }
+
+    def _rows(self, state=None, district=None, pincode=None):
+        """(level, rows) of a region, or None when it has no data."""
+        if pincode is not None:
+            rows = [row for s, d, row in self.pincodes.get(int(pincode), [])
+                    if (not state or s == state) and (not district or d == district)]
+            return ("pincode", rows) if rows else None
+        if district:
+            if state:
+                row = self.districts.get((state, district))
+                return ("district", [row]) if row is not None else None
+            rows = self.district_names.get(district)
+            return ("district", rows) if rows else None
+        if state:
+            return ("state", [self.states[state]]) if state in self.states else None
+        return "all", [0]
+
+    def cumulative(self, state=None, district=None, pincode=None):
+        """Prefix sums of a region's daily totals, or None for an unknown region."""
+        found = self._rows(state, district, pincode)
+        if found is None:
+            return None
+        level, rows = found
+        sums = self.levels[level]
+        return sums[rows[0]] if len(rows) == 1 else sums[rows].sum(axis=0)
+
+    def total(self, date_from=None, date_to=None, **region):
+        """Total of a region over [date_from, date_to] (day ordinals, inclusive)."""
+        cum = self.cumulative(**region)
+        if cum is None or self.first_day is None:
+            return 0
+        lo, hi = self._clip(date_from, date_to)
+        return int(cum[hi + 1] - cum[lo]) if hi >= lo else 0
+
+    def _clip(self, date_from, date_to):
+        # Window as column offsets into the day axis, limited to the days with data
+        lo = 0 if date_from is None else max(date_from - self.first_day, 0)
+        hi = self.last_day - self.first_day if date_to is None else min(date_to, self.last_day) - self.first_day
+        return lo, hi
+
+    def series(self, freq="daily", date_from=None, date_to=None, **region):
+        """
+        ([period start as ISO date], [total]) of a region, one entry per day,
+        Monday-based week or calendar month in the window. Edge periods only
+        count the days inside the window. None for an unknown region.
+        """
+        cum = self.cumulative(**region)
+        if cum is None:
+            return None
+        if self.first_day is None:
+            return [], []
+        lo, hi = self._clip(date_from, date_to)
+        if hi < lo:
+            return [], []
+
+        days = np.arange(lo, hi + 1) + self.first_day
+        if freq == "weekly":
+            # 1970-01-01 was a Thursday; day + 3 counts from a Monday
+            period = days - (days + 3) % 7
+        elif freq == "monthly":
+            months = days.astype("datetime64[D]").astype("datetime64[M]")
+            period = months.astype("datetime64[D]").astype(np.int64)
+        else:
+            period = days
+        starts = np.flatnonzero(np.r_[True, period[1:] != period[:-1]])
+        ends = np.r_[starts[1:], len(days)]
+        totals = cum[lo + ends] - cum[lo + starts]
+        return [day_to_iso(p) for p in period[starts]], totals.tolist()
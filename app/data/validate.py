@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from app.data import schema
+
+# Rules every raw row has to pass before it reaches the analyses
+RULES = ["state", "district", "pincode", "counts", "date"]
+
+
+def _invalid_names(series):
+    """
+    Missing, 'nan' or letter-free names (e.g. a pincode shifted into the state
+    column). Checked once per distinct value and broadcast through the codes.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    bad = [not any(c.isalpha() for c in str(u)) or str(u).strip().lower() == "nan" for u in uniques]
+    # Missing values have code -1, which picks the trailing True
+    return np.array(bad + [True], dtype=bool)[codes]
+
+
+def check(df):
+    """
+    Runs every rule over a raw shard (or chunk) in one vectorized pass each.
+    Returns ({rule: boolean mask of failing rows}, {column: parsed values});
+    the parsed columns let the caller skip parsing dates and counts again.
+    """
+    n = len(df)
+    failed, parsed = {}, {}
+    for col in ("state", "district"):
+        failed[col] = _invalid_names(df[col]) if col in df.columns else np.ones(n, dtype=bool)
+
+    if "pincode" in df.columns:
+        pincode = pd.to_numeric(df["pincode"], errors="coerce")
+        failed["pincode"] = ~(pincode.between(100000, 999999) & (pincode % 1 == 0)).to_numpy()
+        parsed["pincode"] = pincode
+    else:
+        failed["pincode"] = np.ones(n, dtype=bool)
+
+    # Blank counters have always counted as 0; text or negative values do not
+    bad_counts = np.zeros(n, dtype=bool)
+    for col in df.columns:
+        if col in schema.GROUP_KEYS:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        bad_counts |= ((values.isna() & df[col].notna()) | (values < 0)).to_numpy()
+        parsed[col] = values.fillna(0)
+    failed["counts"] = bad_counts
+
+    if schema.DATE_COLUMN in df.columns:
+        dates = pd.to_datetime(df[schema.DATE_COLUMN], format=schema.DATE_FORMAT, errors="coerce")
+        failed["date"] = dates.isna().to_numpy()
+        parsed[schema.DATE_COLUMN] = dates
+    else:
+        failed["date"] = np.ones(n, dtype=bool)
+    return failed, parsed
+
+
+def split(df):
+    """
+    Separates a raw shard into (clean rows with dates/counts parsed,
+    quarantined raw rows with a 'failed_rules' column or None, counters).
+    """
+    failed, parsed = check(df)
+    bad = np.zeros(len(df), dtype=bool)
+    for mask in failed.values():
+        bad |= mask
+    counters = {
+        "rows": len(df),
+        "rejected": int(bad.sum()),
+        "rules": {rule: int(mask.sum()) for rule, mask in failed.items() if mask.any()},
+    }
+
+    quarantined = None
+    if bad.any():
+        quarantined = df[bad].copy()
+        labels = np.full(int(bad.sum()), "", dtype=object)
+        for rule, mask in failed.items():
+            labels = np.where(mask[bad], labels + rule + ",", labels)
+        quarantined["failed_rules"] = [label.rstrip(",") for label in labels]
+
+    clean = df.assign(**parsed)
+    if bad.any():
+        clean = clean[~bad].reset_index(drop=True)
+    return clean, quarantined, counters
+
+
+def merge_counters(shards):
+    """Totals over {shard: counters} as produced by split()."""
+    total = {"rows": 0, "rejected": 0, "rules": {}}
+    for counters in shards.values():
+        total["rows"] += counters["rows"]
+        total["rejected"] += counters["rejected"]
+        for rule, n in counters["rules"].items():
+            total["rules"][rule] = total["rules"].get(rule, 0) + n
+    return total
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+# Optional: without fcntl (Windows) every process parses new shards itself
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class ShardWatcher:
+    """
+    Polls the dataset directories and calls loader.reload() so that newly
+    arrived shards show up without a restart.
+
+    Threads do not survive a fork, so with gunicorn --preload every worker has
+    to start its own watcher; ensure_running() is cheap enough to call per
+    request and (re)starts the thread in whichever process calls it.
+
+    Only one process parses new shards: the one holding the lock on
+    `lock_path`. It writes the snapshot, and the other workers' watchers
+    publish the new data from that snapshot once it is there. When the
+    leader exits, its lock is released and the next check elsewhere takes it.
+    """
+
+    def __init__(self, loader, interval=60, settle=10, lock_path=None):
+        self.loader = loader
+        self.lock_path = lock_path
+        self._lock_file = None
+        self._lock_pid = None
+        self.interval = interval
+        # Shards younger than this (seconds) are assumed to be still copying
+        self.settle = settle
+        self.last_check = None
+        self.last_change = None
+        self.last_error = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        if self.interval <= 0:
+            return
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="shard-watcher", daemon=True)
+            self._thread.start()
+
+    def is_leader(self):
+        """True in the one process that parses new shards, taking the lock if it is free."""
+        if self.lock_path is None or fcntl is None:
+            return True
+        if self._lock_file is not None and self._lock_pid == os.getpid():
+            return True
+        # POSIX record locks belong to one process and are not inherited on fork
+        # (unlike flock), so pool children of the leader never hold it
+        try:
+            f = open(self.lock_path, "a")
+        except OSError:
+            # No writable lock file, no coordination: parse here as before
+            return True
+        try:
+            fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file, self._lock_pid = f, os.getpid()
+        return True
+
+    def check(self, force=False):
+        """
+        Runs one reload pass and records the outcome. Outside the leader only
+        snapshots are picked up, unless `force` is set.
+        """
+        try:
+            actions = self.loader.reload(settle=self.settle, parse=force or self.is_leader())
+            self.last_error = None
+            if actions:
+                self.last_change = {"at": time.time(), "version": self.loader.version, "datasets": actions}
+            return actions
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Dataset reload failed: {e}")
+            return {}
+        finally:
+            self.last_check = time.time()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+    def status(self):
+        return {
+            "enabled": self.interval > 0,
+            "interval_seconds": self.interval,
+            "running": bool(self._thread and self._pid == os.getpid() and self._thread.is_alive()),
+            "leader": self._lock_pid == os.getpid() or self.lock_path is None or fcntl is None,
+            "last_check": self.last_check,
+            "last_change": self.last_change,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,136 @@
+import os
+import zlib
+
+import pandas as pd
+
+from app.data import schema
+
+# Optional: Parquet and Arrow exports need pyarrow, CSV works without it
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Rows serialized per step of a streamed export; bounds its memory
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+
+# format -> (mimetype, file extension)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+LABEL_COLUMN = "Dataset_Type"
+
+
+def export_columns(frames):
+    """Union of the columns of several frames, in order of appearance, plus the label column."""
+    columns = []
+    for df in frames:
+        columns += [col for col in df.columns if col not in columns]
+    return columns + [LABEL_COLUMN]
+
+
+def csv_stream(parts, columns):
+    """
+    CSV of (label, chunks) parts: the header first, then one block of rows
+    per chunk, each chunk put on the common columns (blank where its dataset
+    has no such column) and labelled.
+    """
+    yield (",".join(columns) + "\n").encode()
+    for label, chunks in parts:
+        for chunk in chunks:
+            if not len(chunk):
+                continue
+            block = chunk.reindex(columns=columns[:-1]).assign(**{LABEL_COLUMN: label})
+            yield block.to_csv(index=False, header=False, date_format=schema.DATE_FORMAT).encode()
+
+
+def gzip_stream(blocks, level=6):
+    """Gzips a stream of byte blocks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _Pipe:
+    """Write-only file object pyarrow writes into; drained after every chunk."""
+
+    def __init__(self):
+        self.blocks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.blocks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.blocks = b"".join(self.blocks), []
+        return data
+
+
+def _arrow_type(dtype):
+    if isinstance(dtype, pd.CategoricalDtype) or dtype == object:
+        return pa.string()
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return pa.date32()
+    return pa.from_numpy_dtype(dtype)
+
+
+def arrow_schema(frames, columns):
+    types = {}
+    for df in frames:
+        for col in df.columns:
+            types.setdefault(col, _arrow_type(df[col].dtype))
+    return pa.schema([(col, types.get(col, pa.string())) for col in columns])
+
+
+def _table(chunk, label, arrow_schema):
+    arrays = []
+    for field in arrow_schema:
+        if field.name == LABEL_COLUMN:
+            arrays.append(pa.array([label] * len(chunk), pa.string()))
+        elif field.name not in chunk.columns:
+            arrays.append(pa.nulls(len(chunk), field.type))
+        elif pa.types.is_string(field.type):
+            arrays.append(pa.array(chunk[field.name].to_numpy(dtype=object), pa.string()))
+        else:
+            arrays.append(pa.array(chunk[field.name].to_numpy()).cast(field.type))
+    return pa.Table.from_arrays(arrays, schema=arrow_schema)
+
+
+def arrow_stream(parts, arrow_schema, fmt="parquet"):
+    """
+    Parquet file (one row group per chunk) or Arrow IPC stream of
+    (label, chunks) parts, handed out as it is written.
+    """
+    pipe = _Pipe()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(pipe, arrow_schema)
+    else:
+        writer = pa.ipc.new_stream(pipe, arrow_schema)
+    for label, chunks in parts:
+        for chunk in chunks:
+            if not len(chunk):
+                continue
+            writer.write_table(_table(chunk, label, arrow_schema))
+            data = pipe.drain()
+            if data:
+                yield data
+    writer.close()
+    yield pipe.drain()
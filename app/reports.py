@@ -0,0 +1,278 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from fpdf import FPDF
+
+from app.charts import ChartError, place_chart
+
+# Optional: without fcntl (Windows) job claims are only serialized within one process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Jobs are submitted from request threads while other threads serve requests; a
+# forked renderer would inherit whatever locks they hold, so renderers start fresh
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+
+def _read_marker(marker):
+    try:
+        with open(marker) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def render_report(report, path, marker=None, owner=None):
+    """
+    Renders the full analytical report (summary, ideas and their chart
+    images as built by the export route) into a PDF at `path`, replacing it
+    atomically. Runs in the report pool, so it only touches its arguments.
+    When `marker` no longer names `owner` (the job timed out and was handed
+    to another renderer), the PDF is discarded and None returned.
+    """
+    summary, ideas, charts = report["summary"], report["ideas"], report["charts"]
+
+    pdf = FPDF()
+    pdf.add_page()
+
+    # --- Cover Page ---
+    pdf.set_fill_color(0, 51, 102)
+    pdf.rect(0, 0, 210, 297, 'F')
+
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Arial", 'B', 32)
+    pdf.ln(80)
+    pdf.cell(0, 20, txt="UIDAI HACKATHON 2026", ln=1, align='C')
+    pdf.set_font("Arial", 'B', 18)
+    pdf.cell(0, 10, txt="Comprehensive Data Analytics Report", ln=1, align='C')
+
+    pdf.set_font("Arial", size=12)
+    pdf.ln(100)
+    pdf.cell(0, 10, txt="Generated on: January 2026", ln=1, align='C')
+    pdf.cell(0, 10, txt="Version 2.0 - Interactive Edition", ln=1, align='C')
+
+    # --- Summary Page ---
+    pdf.add_page()
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("Arial", 'B', 20)
+    pdf.cell(0, 15, txt="Executive Overview", ln=1)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(10)
+
+    def draw_stat(label, val):
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(100, 10, txt=label, ln=0)
+        pdf.set_font("Arial", size=12)
+        pdf.cell(0, 10, txt=str(val), ln=1)
+
+    if report.get("scope"):
+        draw_stat("Scope:", report["scope"])
+    draw_stat("Total National Enrolment:", f"{summary['total_enrolment']:,}")
+    draw_stat("Demographic Updates:", f"{summary['total_demographic_updates']:,}")
+    draw_stat("Biometric Updates:", f"{summary['total_biometric_updates']:,}")
+    draw_stat("States Covered:", summary['states_count'])
+    draw_stat("Districts Analyzed:", summary['districts_count'])
+
+    pdf.ln(10)
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, txt="Top 10 Actionable Insights", ln=1)
+
+    # --- 10 Ideas Pages ---
+    for i, (idea, chart_b64) in enumerate(zip(ideas, charts), start=1):
+        pdf.add_page()
+
+        pdf.set_fill_color(240, 240, 240)
+        pdf.set_font("Arial", 'B', 14)
+        pdf.cell(0, 12, txt=f"Insight {i}: {idea.get('title', 'Analysis')}", ln=1, fill=True)
+        pdf.ln(5)
+
+        pdf.set_font("Arial", 'B', 11)
+        pdf.cell(0, 8, txt="Problem Statement:", ln=1)
+        pdf.set_font("Arial", size=10)
+        pdf.multi_cell(0, 6, txt=idea.get('problem', 'N/A'))
+        pdf.ln(5)
+
+        # Insert Chart
+        if chart_b64:
+            try:
+                place_chart(pdf, chart_b64, x=20, y=pdf.get_y(), w=170)
+                pdf.set_y(pdf.get_y() + 85)
+            except (ChartError, RuntimeError) as e:
+                # RuntimeError: FPDF's own errors
+                print(f"Report chart {i} skipped: {e}")
+                pdf.cell(0, 10, txt="[Chart analysis available in portal]", ln=1)
+
+        pdf.ln(5)
+        pdf.set_font("Arial", 'B', 11)
+        pdf.cell(0, 8, txt="Data Insight:", ln=1)
+        pdf.set_font("Arial", size=10)
+        pdf.multi_cell(0, 6, txt=idea.get('insight', 'N/A'))
+
+        pdf.ln(5)
+        pdf.set_fill_color(220, 240, 220)
+        pdf.set_font("Arial", 'B', 11)
+        pdf.cell(0, 8, txt="Recommendation:", ln=1, fill=True)
+        pdf.set_font("Arial", size=10)
+        pdf.multi_cell(0, 6, txt=idea.get('solution', 'N/A'), border='T')
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf.output(dest='S').encode('latin-1'))
+    if marker is not None and _read_marker(marker) != owner:
+        os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+class ReportJobs:
+    """
+    Background rendering of full reports in a local process pool, with the
+    finished PDFs kept in a disk cache.
+
+    A job id is the hash of everything the report depends on (data tag,
+    filter, chart images), so identical requests share one job and one file.
+    Job state lives next to the PDFs (<id>.pending while rendering, <id>.error
+    after a failure), so every server process can answer for every job. The
+    .pending marker holds its owner (pid, thread and start time): jobs are
+    claimed under a lock on jobs.lock, and only the owner may clear its
+    marker or publish its PDF. The cache is trimmed to `max_bytes`, least
+    recently used first.
+    """
+
+    def __init__(self, cache_dir, workers=None, max_bytes=None, timeout=None):
+        self.cache_dir = cache_dir
+        self.workers = workers or int(os.getenv("REPORT_WORKERS", "1"))
+        self.max_bytes = max_bytes or int(os.getenv("REPORT_CACHE_MB", "256")) * 1024 * 1024
+        # Seconds after which a job still marked as rendering is taken as lost
+        self.timeout = timeout or int(os.getenv("REPORT_JOB_TIMEOUT", "600"))
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Record locks are per process, so threads of one process also queue here
+        self._claim_lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def valid(job_id):
+        return len(job_id) == 40 and all(c in "0123456789abcdef" for c in job_id)
+
+    def path(self, job_id, ext="pdf"):
+        return os.path.join(self.cache_dir, f"{job_id}.{ext}")
+
+    def status(self, job_id):
+        """{"job_id", "status": "done" | "running" | "failed", ...}, or None for an unknown job."""
+        pdf = self.path(job_id)
+        if os.path.exists(pdf):
+            return {"job_id": job_id, "status": "done", "bytes": os.path.getsize(pdf)}
+        try:
+            with open(self.path(job_id, "error")) as f:
+                return {"job_id": job_id, "status": "failed", "error": f.read()}
+        except FileNotFoundError:
+            pass
+        try:
+            started = os.path.getmtime(self.path(job_id, "pending"))
+        except FileNotFoundError:
+            return None
+        if time.time() - started > self.timeout:
+            return {"job_id": job_id, "status": "failed", "error": "Rendering did not finish in time"}
+        return {"job_id": job_id, "status": "running", "started": started}
+
+    @contextmanager
+    def _claimed(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._claim_lock, open(os.path.join(self.cache_dir, "jobs.lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.lockf(f, fcntl.LOCK_EX)
+            yield
+
+    def submit(self, job_id, report):
+        """Queues a report unless it is already rendered or rendering; returns its status."""
+        marker = self.path(job_id, "pending")
+        with self._claimed():
+            status = self.status(job_id)
+            if status is not None and status["status"] != "failed":
+                return status
+            owner = f"{os.getpid()}:{threading.get_ident()}:{time.time()}"
+            tmp = f"{marker}.tmp-{os.getpid()}"
+            with open(tmp, "w") as f:
+                f.write(owner)
+            # Takes over a timed-out job too: its renderer then discards its PDF
+            os.replace(tmp, marker)
+            try:
+                os.remove(self.path(job_id, "error"))
+            except FileNotFoundError:
+                pass
+        future = self._executor().submit(render_report, report, self.path(job_id), marker, owner)
+        future.add_done_callback(partial(self._finished, job_id, owner))
+        return {"job_id": job_id, "status": "running", "started": time.time()}
+
+    def _executor(self):
+        # Pools do not survive a fork: every server process starts its own
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=POOL_CONTEXT)
+            return self._pool
+
+    def _finished(self, job_id, owner, future):
+        error = future.exception()
+        if error is not None:
+            print(f"Report {job_id[:12]} failed: {error}")
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._pool = None
+        with self._claimed():
+            marker = self.path(job_id, "pending")
+            if _read_marker(marker) != owner:
+                # Timed out and handed to another renderer, which now owns the job state
+                return
+            if error is not None:
+                with open(self.path(job_id, "error"), "w") as f:
+                    f.write(str(error) or type(error).__name__)
+            os.remove(marker)
+        if error is None:
+            self.evict(keep=self.path(job_id))
+
+    def touch(self, job_id):
+        """Marks a cached report as used, for the eviction order."""
+        try:
+            os.utime(self.path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep=None):
+        """Removes least recently used reports until the cache fits in max_bytes."""
+        files = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.pdf")):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,100 @@
+import gzip
+import os
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+# Optional accelerators: orjson for encoding, brotli for compression.
+# Without them the stdlib encoder and gzip are used.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content codings we produce, preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+# Bodies smaller than this are sent uncompressed (COMPRESS_MIN_BYTES=0 compresses everything)
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESSIBLE = ("application/json", "text/csv")
+
+
+def _default(obj):
+    # NumPy scalars/arrays as handed out by pandas, then Flask's own fallbacks
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return DefaultJSONProvider.default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider behind jsonify(): orjson when it is installed, the stdlib
+    encoder otherwise. NumPy values serialize as they are on both paths, so
+    analyses can return them without converting.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            kwargs.setdefault("default", _default)
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj, indent=bool(kwargs.get("indent"))).decode()
+
+    def _encode(self, obj, indent=False):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # orjson hands back bytes; skip the str round trip
+        return self._app.response_class(self._encode(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def columnar(records):
+    """[{key: value}, ...] -> {key: [value, ...]}, keyed like the first record."""
+    keys = list(records[0]) if records else []
+    return {key: [record.get(key) for record in records] for key in keys}
+
+
+def compress(response, accept_encodings):
+    """
+    Compresses a buffered 200 JSON/CSV body above COMPRESS_MIN_BYTES with
+    the best coding the client accepts. The ETag gets the coding as a suffix,
+    since the compressed body is a different representation.
+    """
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed \
+            or response.mimetype not in COMPRESSIBLE or "Content-Encoding" in response.headers:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers["Content-Encoding"] = encoding
+    tag, weak = response.get_etag()
+    if tag:
+        response.set_etag(f"{tag}-{encoding}", weak)
+    return response
@@ -2,53 +2,267 @@
 from flask import Flask, jsonify, render_template, request, send_file
 from app.data.loader import loader
 from app.data.analyzer import Analyzer
+from app.data.watcher import ShardWatcher
+from app.data.dates import DateWindowError, parse_day, day_to_iso
+from app.data.validate import merge_counters
+from app.data.timeseries import FREQUENCIES
+from app.responses import ENCODINGS, FastJSONProvider, columnar, compress
+from app.charts import decode_chart, place_chart
+from app.reports import ReportJobs
+from app.exports import EXPORT_CHUNK_ROWS, FORMATS, arrow_schema, arrow_stream, csv_stream, export_columns, gzip_stream, pa
 from flask_cors import CORS
 import pandas as pd
 from fpdf import FPDF
+import datetime
+import functools
+import hashlib
+import hmac
 import io
+import json
+import multiprocessing
+import os
+import time
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+# Largest request body accepted (chart uploads for the PDF exports); bigger ones get 413
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', '64')) * 1024 * 1024
 CORS(app)
 
 # Initialize Data
-loader.load_data()
+# STARTUP_MODE: "eager" loads before the app is importable (shared pre-fork with --preload),
+# "background" starts loading in a warm-up thread right away, "lazy" on the first request.
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'eager')
+# Seconds a data request waits for the warm-up before answering 503
+READY_TIMEOUT = float(os.getenv('READY_TIMEOUT', '20'))
+STARTED_AT = time.time()
+
+# Pool processes (shard parsing, report rendering) start from a fresh interpreter and
+# re-import the main module (e.g. run.py) while they bootstrap; they never serve requests
+POOL_BOOTSTRAP = getattr(multiprocessing.current_process(), '_inheriting', False)
+
+if POOL_BOOTSTRAP:
+    pass
+elif STARTUP_MODE == 'eager':
+    loader.load_data()
+elif STARTUP_MODE == 'background':
+    loader.start_background_load()
 analyzer = Analyzer(loader)
 
+# Picks up newly arrived shards without a restart (DATASET_WATCH_INTERVAL=0 disables it)
+# Only the worker holding the lock file parses them; the others load the snapshot it writes
+watcher = ShardWatcher(loader, interval=int(os.getenv('DATASET_WATCH_INTERVAL', '60')),
+                       lock_path=os.path.join(loader.data_dir, '.watcher.lock'))
+
+# Full PDF reports are rendered in a process pool and cached on disk (REPORT_CACHE_DIR)
+report_jobs = ReportJobs(os.getenv('REPORT_CACHE_DIR') or os.path.join(loader.data_dir, '.reports'))
+
+# Seconds browsers and proxies may reuse a data response before revalidating it
+HTTP_MAX_AGE = int(os.getenv('HTTP_MAX_AGE', '0'))
+
+# Endpoints that answer before the datasets are loaded
+NO_DATA_ENDPOINTS = {'static', 'readiness', 'report_job_status', 'report_job_download'}
+
+@app.before_request
+def ensure_data_ready():
+    loader.start_background_load()
+    if request.endpoint in NO_DATA_ENDPOINTS:
+        return None
+    if not loader.wait_until_ready(READY_TIMEOUT):
+        response = jsonify({"error": "Data is still loading, retry shortly", "datasets": loader.load_status})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    watcher.ensure_running()
+
+@app.after_request
+def compress_response(response):
+    return compress(response, request.accept_encodings)
+
+def wants_columns():
+    # ?shape=columns: lists of records are sent as parallel arrays
+    return request.values.get('shape') == 'columns'
+
+@app.errorhandler(DateWindowError)
+def bad_date_window(e):
+    return jsonify({"error": str(e)}), 400
+
+def date_window():
+    """
+    Optional date window of a request, as analyzer keyword arguments:
+    from/to (inclusive, YYYY-MM-DD or DD-MM-YYYY), or days=N for the last N
+    days up to `to` or, without it, up to the latest date in the data.
+    """
+    date_from = request.values.get('from')
+    date_to = request.values.get('to')
+    window = {
+        'date_from': parse_day(date_from) if date_from else None,
+        'date_to': parse_day(date_to) if date_to else None
+    }
+    days = request.values.get('days')
+    if days:
+        if not days.isdigit() or int(days) < 1:
+            raise DateWindowError(f"Invalid days '{days}', expected a positive number")
+        last = window['date_to'] if window['date_to'] is not None else loader.date_bounds()[1]
+        if last is not None:
+            window = {'date_from': last - int(days) + 1, 'date_to': last}
+    if window['date_from'] is not None and window['date_to'] is not None and window['date_from'] > window['date_to']:
+        raise DateWindowError("'from' must not be after 'to'")
+    return window
+
+def request_etag(current):
+    """
+    Strong ETag of a data request: the published data (Generation.tag), the
+    endpoint and its normalized parameters. "All"/empty filters are dropped
+    and the date window is resolved, so equivalent spellings share a tag.
+    """
+    params = sorted((k, v) for k, v in request.values.items(multi=True)
+                    if k not in ('from', 'to', 'days') and v not in ('', 'All'))
+    key = [current.tag, request.endpoint, request.view_args, params, date_window()]
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def conditional(view):
+    """
+    Conditional GET for a data endpoint. A request whose If-None-Match (or
+    If-Modified-Since) still matches the published data gets 304 before the
+    view, and so the Analyzer, runs; 200 responses carry ETag,
+    Last-Modified and Cache-Control.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        current = loader.current
+        if request.method not in ('GET', 'HEAD') or current is None:
+            return view(*args, **kwargs)
+        try:
+            etag = request_etag(current)
+        except DateWindowError:
+            return view(*args, **kwargs)
+        last_modified = datetime.datetime.fromtimestamp(int(current.modified), tz=datetime.timezone.utc)
+
+        matched = None
+        if request.if_none_match:
+            # Compressed bodies carry the coding as a suffix (see app.responses.compress)
+            matched = next((tag for tag in [etag] + [f"{etag}-{encoding}" for encoding in ENCODINGS]
+                            if request.if_none_match.contains(tag)), None)
+            fresh = matched is not None
+        else:
+            fresh = request.if_modified_since is not None and last_modified <= request.if_modified_since
+        response = app.response_class(status=304) if fresh else app.make_response(view(*args, **kwargs))
+        # A reload during the view may have produced newer data than `etag` describes
+        if response.status_code in (200, 304) and loader.current is current:
+            response.set_etag(matched or etag)
+            response.last_modified = last_modified
+            response.cache_control.public = True
+            response.cache_control.max_age = HTTP_MAX_AGE
+            response.cache_control.must_revalidate = True
+        return response
+    return wrapper
+
+@app.route('/api/ready')
+def readiness():
+    ready = loader.current is not None
+    body = {
+        "ready": ready,
+        "version": loader.version,
+        "startup_mode": STARTUP_MODE,
+        "uptime_seconds": round(time.time() - STARTED_AT, 3),
+        "datasets": loader.load_status,
+        "error": loader.load_error
+    }
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/api/data/version')
+def data_version():
+    current = loader.current
+    return jsonify({
+        "version": current.version,
+        "loaded_at": current.loaded_at,
+        "shards": {name: len(files) for name, files in current.shards.items()},
+        "rows": {name: len(df) for name, df in current.frames.items()},
+        "store": loader.store,
+        "cube_cells": {name: cube.size() for name, cube in current.cubes.items()},
+        "result_cache": analyzer.cache.stats(),
+        "anomalies": {name: engine.stats() for name, engine in current.anomalies.items()},
+        "date_range": {
+            name: [day_to_iso(d) if d is not None else None for d in loader.date_bounds(name)]
+            for name in current.frames
+        },
+        "watcher": watcher.status()
+    })
+
+@app.route('/api/data/quality')
+def data_quality():
+    # Rows rejected by ingest validation, per dataset, per shard and per rule
+    return jsonify({
+        name: {
+            "total": merge_counters(shards),
+            "shards": shards,
+            "quarantine_dir": os.path.join(loader.quarantine_dir, name)
+        }
+        for name, shards in loader.quality_report.items()
+    })
+
+# Token required by the admin endpoints (Authorization: Bearer <token>); without one
+# they only answer requests from this machine
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+def admin_only(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if ADMIN_TOKEN:
+            sent = request.headers.get('Authorization', '')
+            allowed = hmac.compare_digest(sent.encode(), f"Bearer {ADMIN_TOKEN}".encode())
+        else:
+            allowed = request.remote_addr in ('127.0.0.1', '::1')
+        if not allowed:
+            return jsonify({"error": "Admin token required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/api/admin/reload', methods=['POST'])
+@admin_only
+def reload_data():
+    changed = watcher.check(force=True)
+    return jsonify({"version": loader.version, "changed": changed, "error": watcher.last_error})
+
 @app.route('/')
 def dashboard():
-    # Sanitize states: Remove numeric-only entries and N/A
-    all_states = loader.enrolment_df['state'].unique().tolist()
-    states = sorted([str(s) for s in all_states if s and not str(s).isdigit() and str(s).lower() != 'nan'])
+    # Malformed state names are quarantined at ingest (see /api/data/quality)
+    states = loader.regions().states()
     return render_template('dashboard.html', states=states)
 
 @app.route('/analysis/idea/<int:idea_id>')
 def analysis_detail(idea_id):
-    states = sorted(loader.enrolment_df['state'].unique().tolist())
+    states = loader.regions().states()
     meta = analyzer.metadata.get(idea_id, {"title": "Unknown Analysis"})
     return render_template('analysis_detail.html', states=states, idea_id=idea_id, title=meta['title'])
 
 @app.route('/analysis/category/<category_type>')
 def category_analysis(category_type):
-    states = sorted(loader.enrolment_df['state'].unique().tolist())
+    states = loader.regions().states()
     return render_template('category_analysis.html', states=states, category=category_type.capitalize())
 
 @app.route('/api/data/summary', methods=['GET'])
+@conditional
 def get_summary():
     state = request.args.get('state')
     district = request.args.get('district')
     if state == "All": state = None
     if district == "All": district = None
     
-    summary = analyzer.get_summary(state_filter=state, district_filter=district)
+    window = date_window()
+    summary = analyzer.get_summary(state_filter=state, district_filter=district, **window)
     
     # If state/district provided, also find top centers in that region
     if state or district:
-        centers = analyzer.get_centers(state_filter=state, district_filter=district)
-        summary['top_centers'] = centers[:10]
+        centers = analyzer.get_centers(state_filter=state, district_filter=district, **window)
+        # Cached results are shared between requests: extend a copy
+        summary = dict(summary, top_centers=columnar(centers[:10]) if wants_columns() else centers[:10])
         
     return jsonify(summary)
 
 @app.route('/api/centers', methods=['GET'])
+@conditional
 def get_centers():
     state = request.args.get('state')
     district = request.args.get('district')
@@ -58,8 +272,31 @@ def get_centers():
     if state == "All": state = None
     if district == "All": district = None
     
-    centers = analyzer.get_centers(state_filter=state, district_filter=district, pincode_filter=pincode, query=query)
-    return jsonify(centers)
+    centers = analyzer.get_centers(state_filter=state, district_filter=district, pincode_filter=pincode, query=query, **date_window())
+    return jsonify(columnar(centers) if wants_columns() else centers)
+
+@app.route('/api/data/timeseries', methods=['GET'])
+@conditional
+def get_timeseries():
+    dataset = request.args.get('dataset', 'enrolment')
+    freq = request.args.get('freq', 'daily')
+    state = request.args.get('state')
+    district = request.args.get('district')
+    pincode = request.args.get('pincode')
+
+    if state == "All": state = None
+    if district == "All": district = None
+    if dataset not in loader.current.timeseries:
+        return jsonify({"error": f"Unknown dataset '{dataset}'"}), 400
+    if freq not in FREQUENCIES:
+        return jsonify({"error": f"freq must be one of {', '.join(FREQUENCIES)}"}), 400
+    if pincode and not pincode.isdigit():
+        return jsonify({"error": "pincode must be numeric"}), 400
+
+    series = analyzer.get_timeseries(dataset, state, district, pincode, freq, **date_window())
+    if series is None:
+        return jsonify({"error": "No data for this region"}), 404
+    return jsonify(series)
 
 @app.route('/api/geocode', methods=['GET'])
 def geocode():
@@ -83,10 +320,16 @@ def geocode():
     
     if q in mocks:
         return jsonify({"lat": mocks[q][0], "lng": mocks[q][1]})
+
+    # Pincodes, and districts/states by the centroid of their known pincodes
+    found = loader.pincodes.locate(q) if q else None
+    if found:
+        return jsonify({"lat": found[0], "lng": found[1]})
     
     return jsonify({"error": "Location not found"}), 404
 
 @app.route('/api/data/idea/<int:idea_id>', methods=['GET', 'POST'])
+@conditional
 def get_idea_data(idea_id):
     state = request.args.get('state') or request.form.get('state')
     district = request.args.get('district') or request.form.get('district')
@@ -94,51 +337,48 @@ def get_idea_data(idea_id):
     if state == "All": state = None
     if district == "All": district = None
 
-    data = {}
-    # Map idea IDs to analyzer methods
-    methods = {
-        1: analyzer.idea_1_district_activity,
-        2: analyzer.idea_2_biometric_camps,
-        3: analyzer.idea_3_age_verifier,
-        4: analyzer.idea_4_ghost_child,
-        5: analyzer.idea_5_integrity_shield,
-        6: analyzer.idea_6_financial,
-        7: analyzer.idea_7_language_support,
-        8: analyzer.idea_8_health_monitor,
-        9: analyzer.idea_9_disaster_planning,
-        10: analyzer.idea_10_urban_traffic
-    }
-    
-    if idea_id in methods:
-        # Some methods accept filtering, some don't (like 5, 6, 8 which use full datasets or logic)
-        # We pass filters to all; Python handles kwargs or we check logic inside function
-        # For simplicity in Analyzer update, most methods accepted filters.
-        # But simpler to just handle call args based on what I wrote in Analyzer.
-        
-        func = methods[idea_id]
-        import inspect
-        sig = inspect.signature(func)
-        
-        args = {}
-        if 'state_filter' in sig.parameters: args['state_filter'] = state
-        if 'district_filter' in sig.parameters: args['district_filter'] = district
-        
-        data = func(**args)
-    else:
+    if idea_id not in analyzer.IDEAS:
         return jsonify({"error": "Invalid Idea ID"}), 400
-        
 
-        
+    data = analyzer.run_idea(idea_id, state, district, **date_window())
     return jsonify(data)
 
+@app.route('/api/data/batch', methods=['GET', 'POST'])
+@conditional
+def get_batch_data():
+    """
+    Summary plus several ideas for one filter in one response, so a dashboard
+    refresh is a single round trip. ?ideas=1,4,5 picks ideas (default all),
+    ?summary=0 leaves the summary out.
+    """
+    state = request.values.get('state')
+    district = request.values.get('district')
+    if state == "All": state = None
+    if district == "All": district = None
+
+    ideas = request.values.get('ideas')
+    idea_ids = None
+    if ideas:
+        try:
+            idea_ids = [int(i) for i in ideas.split(',') if i.strip()]
+        except ValueError:
+            return jsonify({"error": "ideas must be a comma-separated list of idea ids"}), 400
+        unknown = [i for i in idea_ids if i not in analyzer.IDEAS]
+        if unknown:
+            return jsonify({"error": f"Invalid Idea ID: {unknown}"}), 400
+
+    summary = request.values.get('summary', '1') not in ('0', 'false')
+    return jsonify(analyzer.batch(idea_ids, state, district, summary=summary, **date_window()))
+
 @app.route('/api/data/category/<category_type>', methods=['GET'])
+@conditional
 def get_category_data(category_type):
     state = request.args.get('state')
     district = request.args.get('district')
     if state == "All": state = None
     if district == "All": district = None
     
-    data = analyzer.get_category_analysis(category_type, state_filter=state, district_filter=district)
+    data = analyzer.get_category_analysis(category_type, state_filter=state, district_filter=district, **date_window())
     return jsonify(data)
 
 @app.route('/export/category/csv/<category_type>')
@@ -148,7 +388,10 @@ def export_category_csv(category_type):
     if state == "All": state = None
     if district == "All": district = None
     
-    data = analyzer.get_category_analysis(category_type, state_filter=state, district_filter=district)
+    data = analyzer.get_category_analysis(category_type, state_filter=state, district_filter=district, **date_window())
+    if 'error' in data:
+        # e.g. a date window without any rows
+        return jsonify(data), 404
     
     # Create DF for chart data (Top 10) for simplicity in CSV, or full list?
     # Request implied "export data", usually means the chart data or summary. 
@@ -183,7 +426,9 @@ def export_category_pdf(category_type):
     if state == "All": state = None
     if district == "All": district = None
     
-    data = analyzer.get_category_analysis(category_type, state_filter=state, district_filter=district)
+    data = analyzer.get_category_analysis(category_type, state_filter=state, district_filter=district, **date_window())
+    if 'error' in data:
+        return jsonify(data), 404
     
     pdf = FPDF()
     pdf.add_page()
@@ -240,34 +485,14 @@ def export_category_pdf(category_type):
 
     # --- Chart Integration ---
     if chart_image:
-        temp_file = None
         try:
-            import base64
-            import tempfile
-            import os
-            
-            # Decode the base64 image
-            img_data = base64.b64decode(chart_image.split(',')[1])
-            
-            # Create a named temporary file that persists long enough for fpdf to read it
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                tmp.write(img_data)
-                temp_file = tmp.name
-            
-            # Use the file path in fpdf
-            pdf.image(temp_file, x=15, y=pdf.get_y(), w=180)
+            # Decoded in memory (and cached by content) by app.charts
+            place_chart(pdf, chart_image, x=15, y=pdf.get_y(), w=180)
             pdf.set_y(pdf.get_y() + 100) # Space for image
             
         except Exception as e:
             pdf.set_font("Arial", 'I', 8)
             pdf.cell(0, 10, txt=f"[Chart could not be rendered: {str(e)}]", ln=1)
-        finally:
-            # Clean up the temp file
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
 
     pdf.ln(5)
     
@@ -328,7 +553,7 @@ def regional_analysis():
     if not category or not region_name:
         return jsonify({"error": "Missing parameters"}), 400
         
-    context_data = analyzer.get_regional_context(category, region_name, state, district)
+    context_data = analyzer.get_regional_context(category, region_name, state, district, **date_window())
     if not context_data:
         return jsonify({"error": "Failed to get context"}), 404
 
@@ -348,133 +573,51 @@ def regional_analysis():
     4. **Fun Fact**: A small positive or interesting data point.
     """
     
+    try:
+        gemini = get_gemini()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 503
     response = gemini.chat_response(prompt, context=str(context_data))
     return jsonify({"analysis": response, "data": context_data})
 @app.route('/api/districts/<state_name>')
+@conditional
 def get_districts(state_name):
-    districts = sorted(loader.enrolment_df[loader.enrolment_df['state'] == state_name]['district'].unique().tolist())
-    return jsonify(districts)
+    return jsonify(loader.regions().districts(state_name))
+
+@app.route('/api/regions')
+@conditional
+def get_regions():
+    """
+    The whole state -> district -> pincode tree with per-dataset totals, as
+    one document that only changes with the data.
+    """
+    return app.response_class(loader.regions().document, mimetype='application/json')
 
 @app.route('/export/report', methods=['GET', 'POST'])
 def export_report():
     if request.method == 'POST':
-        charts = []
-        for i in range(1, 11):
-            chart_img = request.form.get(f'chart{i}')
-            charts.append(chart_img)
-        
-        pdf = FPDF()
-        pdf.add_page()
-        
-        # --- Cover Page ---
-        pdf.set_fill_color(0, 51, 102)
-        pdf.rect(0, 0, 210, 297, 'F')
-        
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_font("Arial", 'B', 32)
-        pdf.ln(80)
-        pdf.cell(0, 20, txt="UIDAI HACKATHON 2026", ln=1, align='C')
-        pdf.set_font("Arial", 'B', 18)
-        pdf.cell(0, 10, txt="Comprehensive Data Analytics Report", ln=1, align='C')
-        
-        pdf.set_font("Arial", size=12)
-        pdf.ln(100)
-        pdf.cell(0, 10, txt="Generated on: January 2026", ln=1, align='C')
-        pdf.cell(0, 10, txt="Version 2.0 - Interactive Edition", ln=1, align='C')
-        
-        # --- Summary Page ---
-        pdf.add_page()
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", 'B', 20)
-        pdf.cell(0, 15, txt="Executive Overview", ln=1)
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(10)
-        
-        summary = analyzer.get_summary()
-        def draw_stat(label, val, y_off):
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(100, 10, txt=label, ln=0)
-            pdf.set_font("Arial", size=12)
-            pdf.cell(0, 10, txt=str(val), ln=1)
-
-        draw_stat("Total National Enrolment:", f"{summary['total_enrolment']:,}", 0)
-        draw_stat("Demographic Updates:", f"{summary['total_demographic_updates']:,}", 0)
-        draw_stat("Biometric Updates:", f"{summary['total_biometric_updates']:,}", 0)
-        draw_stat("States Covered:", summary['states_count'], 0)
-        draw_stat("Districts Analyzed:", summary['districts_count'], 0)
-        
-        pdf.ln(10)
-        pdf.set_font("Arial", 'B', 16)
-        pdf.cell(0, 10, txt="Top 10 Actionable Insights", ln=1)
-        
-        # --- 10 Ideas Pages ---
-        import base64
-        import tempfile
-        import os
-        
-        for i in range(1, 11):
-            pdf.add_page()
-            meta = analyzer.metadata.get(i, {})
-            # res = get_idea_data(i).json # This might depend on state filters if we want to be precise, but here we assume general
-            # For simplicity, we use a basic call to idea data to get insight
-            res = analyzer.idea_1_district_activity() if i==1 else \
-                  analyzer.idea_2_biometric_camps() if i==2 else \
-                  analyzer.idea_3_age_verifier() if i==3 else \
-                  analyzer.idea_4_ghost_child() if i==4 else \
-                  analyzer.idea_5_integrity_shield() if i==5 else \
-                  analyzer.idea_6_financial() if i==6 else \
-                  analyzer.idea_7_language_support() if i==7 else \
-                  analyzer.idea_8_health_monitor() if i==8 else \
-                  analyzer.idea_9_disaster_planning() if i==9 else \
-                  analyzer.idea_10_urban_traffic()
-            
-            pdf.set_fill_color(240, 240, 240)
-            pdf.set_font("Arial", 'B', 14)
-            pdf.cell(0, 12, txt=f"Insight {i}: {meta.get('title', 'Analysis')}", ln=1, fill=True)
-            pdf.ln(5)
-            
-            pdf.set_font("Arial", 'B', 11)
-            pdf.cell(0, 8, txt="Problem Statement:", ln=1)
-            pdf.set_font("Arial", size=10)
-            pdf.multi_cell(0, 6, txt=meta.get('problem', 'N/A'))
-            pdf.ln(5)
-            
-            # Insert Chart
-            chart_b64 = charts[i-1]
-            if chart_b64:
-                temp_file = None
-                try:
-                    img_data = base64.b64decode(chart_b64.split(',')[1])
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                        tmp.write(img_data)
-                        temp_file = tmp.name
-                    pdf.image(temp_file, x=20, y=pdf.get_y(), w=170)
-                    pdf.set_y(pdf.get_y() + 85)
-                except:
-                    pdf.cell(0, 10, txt="[Chart analysis available in portal]", ln=1)
-                finally:
-                    if temp_file and os.path.exists(temp_file):
-                        try: os.remove(temp_file)
-                        except: pass
-            
-            pdf.ln(5)
-            pdf.set_font("Arial", 'B', 11)
-            pdf.cell(0, 8, txt="Data Insight:", ln=1)
-            pdf.set_font("Arial", size=10)
-            pdf.multi_cell(0, 6, txt=res.get('insight', 'N/A'))
-            
-            pdf.ln(5)
-            pdf.set_fill_color(220, 240, 220)
-            pdf.set_font("Arial", 'B', 11)
-            pdf.cell(0, 8, txt="Recommendation:", ln=1, fill=True)
-            pdf.set_font("Arial", size=10)
-            pdf.multi_cell(0, 6, txt=meta.get('solution', 'N/A'), border='T')
-
-        buffer = io.BytesIO()
-        pdf_content = pdf.output(dest='S').encode('latin-1')
-        buffer.write(pdf_content)
-        buffer.seek(0)
-        return send_file(buffer, as_attachment=True, download_name='UIDAI_Full_Analytical_Report.pdf', mimetype='application/pdf')
+        # Rendered in the background: answers with a job to poll, see /export/report/<job_id>
+        state = request.form.get('state')
+        district = request.form.get('district')
+        if state == "All": state = None
+        if district == "All": district = None
+        window = date_window()
+        charts = [request.form.get(f'chart{i}') for i in range(1, 11)]
+
+        job_id = report_jobs.key(loader.current.tag, state, district, window, charts)
+        status = report_jobs.status(job_id)
+        if status is None or status['status'] == 'failed':
+            results = analyzer.batch(None, state, district, summary=True, **window)
+            ideas = []
+            for i in range(1, 11):
+                meta = analyzer.metadata.get(i, {})
+                ideas.append({'title': meta.get('title', 'Analysis'), 'problem': meta.get('problem', 'N/A'),
+                              'solution': meta.get('solution', 'N/A'),
+                              'insight': results['ideas'][i].get('insight', 'N/A')})
+            scope = f"{state or 'National'}, {district or 'All Districts'}" if state or district else None
+            report = {'summary': results['summary'], 'ideas': ideas, 'charts': charts, 'scope': scope}
+            status = report_jobs.submit(job_id, report)
+        return report_job_response(status)
 
     # GET request fallback or simpler report
     pdf = FPDF()
@@ -488,6 +631,30 @@ def export_report():
     buffer.seek(0)
     return send_file(buffer, as_attachment=True, download_name='UIDAI_Report_Summary.pdf', mimetype='application/pdf')
 
+def report_job_response(status):
+    status = dict(status, status_url=f"/export/report/{status['job_id']}")
+    if status['status'] == 'done':
+        status['download_url'] = f"/export/report/{status['job_id']}/download"
+    return jsonify(status), 202 if status['status'] == 'running' else 200
+
+@app.route('/export/report/<job_id>')
+def report_job_status(job_id):
+    status = report_jobs.status(job_id) if report_jobs.valid(job_id) else None
+    if status is None:
+        return jsonify({"error": "Unknown report job"}), 404
+    return report_job_response(status)
+
+@app.route('/export/report/<job_id>/download')
+def report_job_download(job_id):
+    status = report_jobs.status(job_id) if report_jobs.valid(job_id) else None
+    if status is None:
+        return jsonify({"error": "Unknown report job"}), 404
+    if status['status'] != 'done':
+        return jsonify(status), 409
+    report_jobs.touch(job_id)
+    return send_file(report_jobs.path(job_id), as_attachment=True, download_name='UIDAI_Full_Analytical_Report.pdf',
+                     mimetype='application/pdf')
+
 @app.route('/export/idea/<int:idea_id>', methods=['GET', 'POST'])
 def export_idea_report(idea_id):
     # Single Idea PDF Report
@@ -498,13 +665,11 @@ def export_idea_report(idea_id):
     if state == "All": state = None
     if district == "All": district = None
 
-    # Get Data
-    data = get_idea_data(idea_id)
-    if hasattr(data, 'json'):
-        res = data.json
-    else:
-        # Fallback if called internally (though we use routes)
-        res = analyzer.metadata.get(idea_id, {})
+    if idea_id not in analyzer.IDEAS:
+        return jsonify({"error": "Invalid Idea ID"}), 400
+
+    # Get Data (straight from the analyzer: the JSON view may answer 304 without a body)
+    res = analyzer.run_idea(idea_id, state, district, **date_window())
 
     pdf = FPDF()
     pdf.add_page()
@@ -547,27 +712,14 @@ def export_idea_report(idea_id):
 
     # --- Chart Integration ---
     if chart_image:
-        temp_file = None
         try:
-            import base64
-            import tempfile
-            import os
-            
-            img_data = base64.b64decode(chart_image.split(',')[1])
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                tmp.write(img_data)
-                temp_file = tmp.name
-            
+            decode_chart(chart_image)  # fails before the heading is drawn
             pdf.set_font("Arial", 'B', 12)
             pdf.cell(0, 10, txt="Statistical Visualization", ln=1)
-            pdf.image(temp_file, x=15, y=pdf.get_y(), w=180)
+            place_chart(pdf, chart_image, x=15, y=pdf.get_y(), w=180)
             pdf.set_y(pdf.get_y() + 90)
         except Exception as e:
             pdf.cell(0, 10, txt="[Visual data included in digital version]", ln=1)
-        finally:
-            if temp_file and os.path.exists(temp_file):
-                try: os.remove(temp_file)
-                except: pass
 
     # --- Key Insight ---
     pdf.ln(10)
@@ -605,8 +757,12 @@ def export_idea_csv(idea_id):
     # Single Idea CSV Export
     state = request.args.get('state')
     district = request.args.get('district')
-    
-    res = get_idea_data(idea_id).json
+    if state == "All": state = None
+    if district == "All": district = None
+    if idea_id not in analyzer.IDEAS:
+        return jsonify({"error": "Invalid Idea ID"}), 400
+
+    res = analyzer.run_idea(idea_id, state, district, **date_window())
     
     # Create DataFrame from labels and data
     df = pd.DataFrame({
@@ -621,8 +777,16 @@ def export_idea_csv(idea_id):
     return send_file(buffer, as_attachment=True, download_name=f'Idea_{idea_id}_Data.csv', mimetype='text/csv')
 
 # Chatbot Route
-from app.gemini_analysis import GeminiAnalyzer
-gemini = GeminiAnalyzer()
+# The Gemini client (and its heavy SDK import) is created on first use, so the app
+# starts without network access or GEMINI_API_KEY; only the AI endpoints need them.
+_gemini = None
+
+def get_gemini():
+    global _gemini
+    if _gemini is None:
+        from app.gemini_analysis import GeminiAnalyzer
+        _gemini = GeminiAnalyzer()
+    return _gemini
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -642,14 +806,14 @@ def chat():
     # Calculate total enrolment per state (sum of all age groups)
     state_df = loader.enrolment_df.copy()
     state_df['total_enrolment'] = state_df['age_0_5'] + state_df['age_5_17'] + state_df['age_18_above']
-    state_summary = state_df.groupby('state')['total_enrolment'].sum().sort_values(ascending=False).head(10).reset_index()
+    state_summary = state_df.groupby('state', observed=True)['total_enrolment'].sum().sort_values(ascending=False).head(10).reset_index()
     
     state_context = "\nTop 10 States by Enrolment:\n| State | Total Enrolment |\n|---|---|\n"
     for _, row in state_summary.iterrows():
         state_context += f"| {row['state']} | {int(row['total_enrolment']):,} |\n"
         
     # 2. District-wise Insights (Top 5 Overall)
-    district_summary = state_df.groupby(['state', 'district'])['total_enrolment'].sum().sort_values(ascending=False).head(5).reset_index()
+    district_summary = state_df.groupby(['state', 'district'], observed=True)['total_enrolment'].sum().sort_values(ascending=False).head(5).reset_index()
     district_context = "\nTop 5 Districts by Enrolment:\n| District | State | Total Enrolment |\n|---|---|---|\n"
     for _, row in district_summary.iterrows():
         district_context += f"| {row['district']} | {row['state']} | {int(row['total_enrolment']):,} |\n"
@@ -722,34 +886,50 @@ def chat():
     
     language = request.form.get('language', 'en')
     
+    try:
+        gemini = get_gemini()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 503
     response = gemini.chat_response(message, context=context, image_data=image_data, language=language)
     return jsonify({"response": response})
 
 @app.route('/export/global/dataset')
 def export_global_dataset():
-    # Export full filtered data as CSV
+    # Export full filtered data, streamed in chunks: CSV (optionally gzipped), Parquet or Arrow
     state = request.args.get('state')
     district = request.args.get('district')
+    fmt = request.args.get('format', 'csv').lower()
+    compression = request.args.get('compression', '').lower()
     
     if state == "All": state = None
     if district == "All": district = None
 
-    # We concatenate all dataframes but filtered
-    df_enrol = analyzer.filter_data(loader.enrolment_df, state, district).copy()
-    df_enrol['Dataset_Type'] = 'Enrolment'
-    
-    df_demo = analyzer.filter_data(loader.demographic_df, state, district).copy()
-    df_demo['Dataset_Type'] = 'Demographic'
-    
-    df_bio = analyzer.filter_data(loader.biometric_df, state, district).copy()
-    df_bio['Dataset_Type'] = 'Biometric'
-    
-    full_df = pd.concat([df_enrol, df_demo, df_bio], ignore_index=True)
-    
-    buffer = io.BytesIO()
-    full_df.to_csv(buffer, index=False)
-    buffer.seek(0)
-    
-    fname = f"UIDAI_Filtered_Dataset_{state or 'All'}_{district or 'All'}.csv"
-    return send_file(buffer, as_attachment=True, download_name=fname, mimetype='text/csv')
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(FORMATS)}"}), 400
+    if compression not in ('', 'gzip') or (compression and fmt != 'csv'):
+        return jsonify({"error": "compression=gzip is only available for CSV"}), 400
+    if fmt != 'csv' and pa is None:
+        return jsonify({"error": f"{fmt} export needs pyarrow installed on the server"}), 501
+
+    # Datasets one after another, each in row chunks of the published frame,
+    # so an export never holds more than one chunk
+    window = date_window()
+    current = loader.current
+    datasets = [('enrolment', 'Enrolment'), ('demographic', 'Demographic'), ('biometric', 'Biometric')]
+    frames = [current.frames[name] for name, _ in datasets]
+    columns = export_columns(frames)
+    parts = [(label, current.cubes[name].chunks(EXPORT_CHUNK_ROWS, state, district, **window))
+             for name, label in datasets]
+
+    mimetype, ext = FORMATS[fmt]
+    if fmt == 'csv':
+        body = csv_stream(parts, columns)
+        if compression:
+            body, mimetype, ext = gzip_stream(body), 'application/gzip', 'csv.gz'
+    else:
+        body = arrow_stream(parts, arrow_schema(frames, columns), fmt)
+
+    fname = f"UIDAI_Filtered_Dataset_{state or 'All'}_{district or 'All'}.{ext}"
+    return app.response_class(body, mimetype=mimetype,
+                              headers={'Content-Disposition': f'attachment; filename="{fname}"'})
 